@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from typing import Optional
@@ -51,7 +52,7 @@ class UserResponse(BaseModel):
 
 
 @router.post("/register")
-async def register(
+def register(
     user: UserCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
 ):
     try:
@@ -114,7 +115,7 @@ def verify_otp(data: OTPVerify, db: Session = Depends(get_db)):
 
 
 @router.post("/resend-verification")
-async def resend_verification(
+def resend_verification(
     data: ResendVerification,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -148,6 +149,12 @@ async def login(request: Request, db: Session = Depends(get_db)):
     if not username or not password:
         raise HTTPException(status_code=400, detail="Username and password required")
 
+    # The sync session and bcrypt would otherwise block the event loop; with a
+    # small pool a blocked checkout there can never be released.
+    return await run_in_threadpool(authenticate, db, username, password)
+
+
+def authenticate(db: Session, username: str, password: str):
     pending = (
         db.query(PendingUser)
         .filter((PendingUser.username == username) | (PendingUser.email == username))
@@ -188,7 +195,7 @@ def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
 
 
 @router.post("/forgot-password")
-async def forgot_password(
+def forgot_password(
     data: ForgotPasswordRequest,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
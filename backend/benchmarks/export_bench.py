@@ -0,0 +1,122 @@
+"""Export and import throughput and memory for one user with a long history.
+
+Seeds a throwaway SQLite database, streams the user's history through
+``chat_router.export_history`` into a file, then re-imports it for a
+second user with ``chat_router.import_history``. Peak Python heap is
+reported next to loading the same history in one query, the way a
+client paging through get_messages ends up holding it.
+
+    python -m benchmarks.export_bench --messages 100000 --sessions 200
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--chunk-bytes", type=int, default=64 * 1024, help="import upload chunk size")
+    return parser.parse_args()
+
+
+def seed(args):
+    from sqlalchemy import insert
+    from database import SessionLocal, sync_schema
+    from models import ChatSession, ChatMessage
+
+    sync_schema()
+    per_session = max(1, args.messages // args.sessions)
+    with SessionLocal() as db:
+        db.execute(insert(ChatSession), [
+            {"id": f"s-{s}", "user_id": 1, "scripture_id": "gita", "religion_id": "hinduism", "title": f"Chat {s}"}
+            for s in range(args.sessions)
+        ])
+        rows = []
+        for n in range(args.messages):
+            rows.append({
+                "session_id": f"s-{min(n // per_session, args.sessions - 1)}",
+                "role": "user" if n % 2 == 0 else "ai",
+                "content": f"message {n} " + "lorem ipsum dolor sit amet " * 12,
+                "verses_json": '[{"reference": "Bhagavad Gita 2.47", "text": "You have a right to action alone."}]'
+                if n % 2 else None,
+            })
+            if len(rows) == 10000:
+                db.execute(insert(ChatMessage), rows)
+                rows = []
+        if rows:
+            db.execute(insert(ChatMessage), rows)
+        db.commit()
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed:7.2f}s  peak heap {peak / 1e6:7.1f} MB  {result}")
+
+
+async def export_to(path):
+    from chat_router import export_history
+
+    size = lines = 0
+    with open(path, "w", encoding="utf-8") as f:
+        async for chunk in export_history(1):
+            f.write(chunk)
+            size += len(chunk)
+            lines += chunk.count("\n")
+    return f"{lines} lines, {size / 1e6:.1f} MB"
+
+
+async def file_chunks(path, chunk_bytes):
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_bytes):
+            yield chunk
+
+
+async def import_from(path, chunk_bytes):
+    from chat_router import import_history
+
+    return await import_history(2, file_chunks(path, chunk_bytes))
+
+
+def load_all():
+    from sqlalchemy import select
+    from database import SessionLocal
+    from models import ChatSession, ChatMessage
+
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(ChatMessage)
+            .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+            .where(ChatSession.user_id == 1)
+        ).scalars().all()
+        return f"{len(rows)} messages"
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="secularai-export-")
+    # Must be set before database.py is imported.
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    path = os.path.join(workdir, "export.ndjson")
+
+    start = time.perf_counter()
+    seed(args)
+    print(f"seeded {args.messages} messages in {time.perf_counter() - start:.1f}s")
+
+    measure("load all (baseline)", load_all)
+    measure("export (stream)", lambda: asyncio.run(export_to(path)))
+    measure("import (batched)", lambda: asyncio.run(import_from(path, args.chunk_bytes)))
+
+
+if __name__ == "__main__":
+    main()
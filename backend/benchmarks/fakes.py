@@ -0,0 +1,298 @@
+"""Local stand-ins for Groq, Mistral embeddings and Pinecone.
+
+Nothing here talks to the network except the fake Groq server, which only
+listens on 127.0.0.1. Call ``install()`` after importing ``main`` so the
+backend's module-level clients are pointed at these fakes.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores.utils import maximal_marginal_relevance
+import hashlib
+import json
+import threading
+import time
+import uuid
+
+import numpy as np
+
+FAKE_REPLY = (
+    "Stay steady and do your part without clinging to the outcome.\n"
+    '[VERSE title="Bhagavad Gita Chapter 2, Verse 47"]\n'
+    "You have a right to perform your prescribed duty, but not to the fruits of action.\n"
+    "[/VERSE]\n"
+    "Focus on the next small step and let the rest unfold."
+)
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embedding: same text, same unit vector."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.calls = 0
+        self.texts = 0
+
+    def _embed(self, text: str):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class InMemoryVectorStore:
+    """Namespace-aware cosine store exposing the PineconeVectorStore methods we use."""
+
+    def __init__(self, embedding: Embeddings):
+        self.embedding = embedding
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def add_documents(self, documents, ids=None, namespace=None, **kwargs):
+        vectors = self.embedding.embed_documents([d.page_content for d in documents])
+        ids = ids or [str(uuid.uuid4()) for _ in documents]
+        with self._lock:
+            docs, matrix = self._namespaces.get(namespace, ([], None))
+            new = np.asarray(vectors, dtype=np.float32)
+            matrix = new if matrix is None else np.vstack([matrix, new])
+            self._namespaces[namespace] = (docs + list(documents), matrix)
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, namespace=None, **kwargs):
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        return self.add_documents(documents, ids=ids, namespace=namespace)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, namespace=None, **kwargs):
+        docs, matrix = self._namespaces.get(namespace, ([], None))
+        if matrix is None:
+            return []
+        scores = matrix @ np.asarray(embedding, dtype=np.float32)
+        top = np.argsort(-scores)[:k]
+        return [(docs[i], float(scores[i])) for i in top]
+
+    def max_marginal_relevance_search_by_vector(
+        self, embedding, k=4, fetch_k=20, lambda_mult=0.5, namespace=None, **kwargs
+    ):
+        docs, matrix = self._namespaces.get(namespace, ([], None))
+        if matrix is None:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        candidates = np.argsort(-(matrix @ query))[:fetch_k]
+        picked = maximal_marginal_relevance(
+            query, matrix[candidates], k=k, lambda_mult=lambda_mult
+        )
+        return [docs[candidates[i]] for i in picked]
+
+    def load_namespace(self, namespace, documents, vectors):
+        with self._lock:
+            self._namespaces[namespace] = (list(documents), np.asarray(vectors, dtype=np.float32))
+
+    def similarity_search(self, query, k=4, namespace=None, **kwargs):
+        embedding = self.embedding.embed_query(query)
+        return [d for d, _ in self.similarity_search_by_vector_with_score(embedding, k, namespace)]
+
+    def delete(self, ids=None, delete_all=None, namespace=None, **kwargs):
+        with self._lock:
+            if delete_all:
+                self._namespaces.pop(namespace, None)
+
+    def namespaces(self):
+        with self._lock:
+            return {ns: len(docs) for ns, (docs, _) in self._namespaces.items()}
+
+
+class FakeGroqServer:
+    """Groq/OpenAI-compatible chat completions endpoint on localhost."""
+
+    def __init__(self, latency_s: float = 0.5, token_delay_s: float = 0.0, reply: str = FAKE_REPLY):
+        self.latency_s = latency_s
+        self.token_delay_s = token_delay_s
+        self.reply = reply
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._count_lock:
+                    fake.requests += 1
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    self._respond(body)
+                finally:
+                    with fake._count_lock:
+                        fake.in_flight -= 1
+
+            def _respond(self, body):
+                time.sleep(fake.latency_s)
+
+                model = body.get("model", "fake-model")
+                prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+                usage = {
+                    "prompt_tokens": prompt_chars // 4,
+                    "completion_tokens": len(fake.reply) // 4,
+                    "total_tokens": (prompt_chars + len(fake.reply)) // 4,
+                }
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                created = int(time.time())
+
+                if body.get("stream"):
+                    self._stream(completion_id, created, model, usage)
+                    return
+
+                payload = json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": fake.reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                }).encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, completion_id, created, model, usage):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                words = fake.reply.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word if i == 0 else " " + word},
+                            "finish_reason": None,
+                        }],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    if fake.token_delay_s:
+                        time.sleep(fake.token_delay_s)
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "x_groq": {"usage": usage},
+                }
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def seed_scriptures(store: InMemoryVectorStore, namespaces, verses_per_namespace: int = 200):
+    topics = [
+        "duty", "anger", "fear", "desire", "peace", "death", "love", "mind",
+        "action", "detachment", "forgiveness", "truth", "suffering", "joy",
+    ]
+    for ns in namespaces:
+        docs = [
+            Document(
+                page_content=(
+                    f"{ns} verse {i}: on {topics[i % len(topics)]} and "
+                    f"{topics[(i * 7) % len(topics)]}, the wise remain steady."
+                ),
+                metadata={"namespace": ns, "verse": i},
+            )
+            for i in range(verses_per_namespace)
+        ]
+        store.add_documents(docs, namespace=ns)
+
+
+def make_pdf(lines) -> bytes:
+    """Build a minimal single-page PDF whose text pypdf can extract."""
+    text_ops = "BT /F1 11 Tf 50 780 Td 14 TL " + " ".join(
+        "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '"
+        for line in lines
+    ) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        "/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(text_ops)} >>\nstream\n{text_ops}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n"
+    ).encode()
+    return out
+
+
+def install(store: InMemoryVectorStore, embeddings: Embeddings):
+    """Point the already-imported backend modules at the fakes."""
+    import query
+    from embedding_batcher import BatchedEmbeddings
+
+    query.embeddings = BatchedEmbeddings(embeddings)
+    query.vector_store = store
+    # Without these, upsert_embeddings and list_namespaces would still reach a
+    # real index whenever .env supplies a Pinecone key.
+    query.index = None
+    query.pc = None
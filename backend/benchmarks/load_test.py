@@ -0,0 +1,308 @@
+"""Offline load test for the FastAPI app.
+
+Boots ``main.app`` under uvicorn against a temporary SQLite database, a fake
+Groq server, a deterministic embedding stub and an in-memory vector store,
+then drives concurrent virtual users through login, session creation, PDF
+upload, /query and message listing.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --users 20 --queries 5 --llm-latency 0.5
+
+llm_max_concurrency in the report is the peak number of completions the
+fake Groq server saw at once. With --users above Starlette's default
+threadpool size (40) it should track --users, showing /query is bounded
+by LLM_WORKERS rather than the request threadpool.
+
+--probe keeps a separate user polling the session list, sidebar summary
+and usage endpoints while the /query calls are in flight; probe_* latencies
+should stay flat even with --db-pool-size well below --users, because
+/query holds no connection during retrieval and generation. The db_pool
+section reports connection checkout wait and hold times per engine.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.fakes import FakeGroqServer, HashEmbeddings, InMemoryVectorStore, install, make_pdf, seed_scriptures
+
+QUESTIONS = [
+    "How do I deal with anger at work?",
+    "What does it say about fear of failure?",
+    "How can I find peace after losing someone?",
+    "Why should I act without attachment to results?",
+    "How do I forgive someone who hurt me?",
+    "What is my duty when I feel lost?",
+]
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--queries", type=int, default=5, help="/query calls per user")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake Groq latency in seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="per-token delay for streamed replies")
+    parser.add_argument("--scripture", default="gita")
+    parser.add_argument("--cache-url", default="memory://", help="CACHE_URL for the app, e.g. sqlite:///cache.db")
+    parser.add_argument("--no-upload", action="store_true", help="skip the PDF upload step")
+    parser.add_argument("--probe", action="store_true", help="poll other endpoints while /query runs")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="seconds between probe rounds")
+    parser.add_argument("--db-pool-size", type=int, help="fixed connection pool size (no overflow)")
+    parser.add_argument("--output", help="report path (default: benchmarks/results/load_<commit>_<time>.json)")
+    return parser.parse_args()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def summarize(samples, wall_s):
+    if not samples:
+        return {"count": 0}
+    latencies = np.array([s for s, ok in samples]) * 1000
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / wall_s, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "max_ms": round(float(latencies.max()), 2),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    async def call(self, name, coro):
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await coro
+            ok = response.status_code < 400 and "error" not in (response.text[:20])
+            return response
+        finally:
+            self.samples[name].append((time.perf_counter() - start, ok))
+
+
+def start_server(app):
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def virtual_user(client, recorder, n, args, pdf_bytes):
+    login = await recorder.call(
+        "login",
+        client.post("/api/auth/login", json={"username": f"bench{n}", "password": "bench-password"}),
+    )
+    headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+    created = await recorder.call(
+        "create_session",
+        client.post(
+            "/api/chat/sessions",
+            json={"scripture_id": args.scripture, "religion_id": "hinduism"},
+            headers=headers,
+        ),
+    )
+    session_id = created.json()["id"]
+
+    if pdf_bytes:
+        await recorder.call(
+            "upload_pdf",
+            client.post(
+                "/api/chat/upload-pdf",
+                data={"session_id": session_id},
+                files={"file": (f"notes{n}.pdf", pdf_bytes, "application/pdf")},
+                headers=headers,
+            ),
+        )
+
+    for i in range(args.queries):
+        await recorder.call(
+            "query",
+            client.post(
+                "/query",
+                json={
+                    "user_query": QUESTIONS[(n + i) % len(QUESTIONS)],
+                    "scripture": args.scripture,
+                    "session_id": session_id,
+                },
+            ),
+        )
+        await recorder.call(
+            "messages",
+            client.get(f"/api/chat/messages/{session_id}", headers=headers),
+        )
+
+
+async def probe(client, recorder, args, stop):
+    login = await client.post("/api/auth/login", json={"username": "benchprobe", "password": "bench-password"})
+    headers = {"Authorization": f"Bearer {login.json()['token']}"}
+    while not stop.is_set():
+        await recorder.call("probe_sessions", client.get(f"/api/chat/sessions/{args.scripture}", headers=headers))
+        await recorder.call(
+            "probe_summary", client.get(f"/api/chat/sessions/{args.scripture}/summary", headers=headers)
+        )
+        await recorder.call("probe_usage", client.get("/api/usage/me", headers=headers))
+        await asyncio.sleep(args.probe_interval)
+
+
+async def drive(base_url, args, pdf_bytes):
+    import httpx
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(client, recorder, args, stop)) if args.probe else None
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            virtual_user(client, recorder, n, args, pdf_bytes) for n in range(args.users)
+        ])
+        wall_s = time.perf_counter() - start
+        stop.set()
+        if prober:
+            await prober
+    return recorder, wall_s
+
+
+def pool_stats():
+    from prometheus_client import REGISTRY
+
+    stats = {}
+    for engine in ["sync", "async"]:
+        labels = {"engine": engine}
+        waits = REGISTRY.get_sample_value("secularai_db_pool_wait_seconds_count", labels) or 0
+        wait_s = REGISTRY.get_sample_value("secularai_db_pool_wait_seconds_sum", labels) or 0
+        holds = REGISTRY.get_sample_value("secularai_db_pool_hold_seconds_count", labels) or 0
+        hold_s = REGISTRY.get_sample_value("secularai_db_pool_hold_seconds_sum", labels) or 0
+        stats[engine] = {
+            "checkouts": int(waits),
+            "avg_wait_ms": round(wait_s / waits * 1000, 3) if waits else None,
+            "avg_hold_ms": round(hold_s / holds * 1000, 3) if holds else None,
+        }
+    return stats
+
+
+def run():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="secularai-bench-")
+
+    groq = FakeGroqServer(latency_s=args.llm_latency, token_delay_s=args.token_delay).start()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["GROQ_BASE_URL"] = groq.base_url
+    os.environ["GROQ_API_KEY"] = "fake"
+    os.environ["CACHE_URL"] = args.cache_url
+    os.environ["JANITOR_ENABLED"] = "false"
+    # Empty rather than unset: load_dotenv() would restore a popped key from .env.
+    os.environ["PINECONE_API_KEY"] = ""
+    if args.db_pool_size:
+        # Pool settings only apply to SQLite under the tuning profile.
+        os.environ["SQLITE_TUNING"] = "true"
+        os.environ["DB_POOL_SIZE"] = str(args.db_pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = "0"
+
+    from sqlalchemy import event
+    import database
+    import models
+    from auth_utils import get_password_hash
+    import main as app_module
+    from cache import cache_stats
+
+    embeddings = HashEmbeddings()
+    store = InMemoryVectorStore(embeddings)
+    seed_scriptures(store, ["gita", "bible", "quran", "torah", "dhammapada", "gurugrantsahib"])
+    install(store, embeddings)
+
+    db_queries = [0]
+
+    def _count(*_):
+        db_queries[0] += 1
+
+    # Chat reads and writes go through the async engine, so count both.
+    for counted in (database.engine, database.async_engine.sync_engine):
+        event.listen(counted, "after_cursor_execute", _count)
+
+    hashed = get_password_hash("bench-password")
+    with database.SessionLocal() as db:
+        for n in range(args.users):
+            db.add(models.User(username=f"bench{n}", email=f"bench{n}@example.com", hashed_password=hashed))
+        db.add(models.User(username="benchprobe", email="benchprobe@example.com", hashed_password=hashed))
+        db.commit()
+
+    pdf_bytes = None if args.no_upload else make_pdf(
+        [f"Line {i}: my notes on duty, fear and letting go." for i in range(40)]
+    )
+
+    server, thread, base_url = start_server(app_module.app)
+    queries_before = db_queries[0]
+    try:
+        recorder, wall_s = asyncio.run(drive(base_url, args, pdf_bytes))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        groq.stop()
+
+    total_requests = sum(len(s) for s in recorder.samples.values())
+    db_count = db_queries[0] - queries_before
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "wall_seconds": round(wall_s, 3),
+        "requests": total_requests,
+        "rps": round(total_requests / wall_s, 2),
+        "db_queries": db_count,
+        "db_queries_per_request": round(db_count / max(total_requests, 1), 2),
+        "llm_requests": groq.requests,
+        "llm_max_concurrency": groq.max_in_flight,
+        "embedding_calls": embeddings.calls,
+        "embedded_texts": embeddings.texts,
+        "caches": cache_stats(),
+        "db_pool": pool_stats(),
+        "endpoints": {name: summarize(s, wall_s) for name, s in sorted(recorder.samples.items())},
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"load_{report['commit']}_{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    json.dump(report, sys.stdout, indent=2)
+    print(f"\nSaved report to {output}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,247 @@
+"""Retrieval quality vs. latency benchmark for the scripture namespaces.
+
+Two steps:
+
+    # one-time, needs MISTRAL_API_KEY (or --embedder hash for a fully local run)
+    python -m benchmarks.retrieval_bench build --namespace gita --pdf data/gita.pdf --chunk-sizes 500 1000
+
+    # offline, as often as you like
+    python -m benchmarks.retrieval_bench run --k 3 5 8 --strategies similarity mmr
+
+``build`` chunks the source PDF at each chunk size, embeds the chunks and
+the labelled questions, and stores them under benchmarks/embeddings/.
+``run`` loads those snapshots into a local vector store, routes every
+question through ``query.similarity_search`` and reports recall@k, MRR,
+mean context tokens and retrieval latency per configuration.
+
+Labels live in benchmarks/labels/<namespace>.json. A retrieved chunk counts
+as a hit for an expected verse when it contains that verse's snippet
+(case and whitespace insensitive), so snippets should be copied from the
+translation that was ingested.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+LABELS_DIR = os.path.join(HERE, "labels")
+EMBEDDINGS_DIR = os.path.join(HERE, "embeddings")
+RESULTS_DIR = os.path.join(HERE, "results")
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def load_labels(namespace: str):
+    with open(os.path.join(LABELS_DIR, f"{namespace}.json")) as f:
+        return json.load(f)["pairs"]
+
+
+def snapshot_path(namespace: str, chunk_size: int):
+    return os.path.join(EMBEDDINGS_DIR, f"{namespace}_c{chunk_size}")
+
+
+def get_embedder(name: str):
+    if name == "hash":
+        from benchmarks.fakes import HashEmbeddings
+        return HashEmbeddings()
+    from langchain_mistralai import MistralAIEmbeddings
+    return MistralAIEmbeddings(model="mistral-embed")
+
+
+def build(args):
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+    embedder = get_embedder(args.embedder)
+    pages = PyPDFLoader(args.pdf).load()
+
+    for chunk_size in args.chunk_sizes:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_size // 10,
+            separators=["\n\n", "\n", " ", ""],
+        )
+        chunks = splitter.split_documents(pages)
+        texts = [c.page_content for c in chunks]
+        vectors = []
+        for i in range(0, len(texts), args.batch_size):
+            vectors.extend(embedder.embed_documents(texts[i : i + args.batch_size]))
+
+        base = snapshot_path(args.namespace, chunk_size)
+        np.save(base + ".npy", np.asarray(vectors, dtype=np.float32))
+        with open(base + ".json", "w") as f:
+            json.dump({
+                "embedder": args.embedder,
+                "chunk_size": chunk_size,
+                "texts": texts,
+                "pages": [c.metadata.get("page") for c in chunks],
+            }, f)
+        print(f"{args.namespace} chunk_size={chunk_size}: {len(texts)} chunks")
+
+    questions = [p["question"] for p in load_labels(args.namespace)]
+    query_vectors = embedder.embed_documents(questions)
+    base = os.path.join(EMBEDDINGS_DIR, f"{args.namespace}_queries")
+    np.save(base + ".npy", np.asarray(query_vectors, dtype=np.float32))
+    with open(base + ".json", "w") as f:
+        json.dump({"embedder": args.embedder, "questions": questions}, f)
+    print(f"{args.namespace}: embedded {len(questions)} questions")
+
+
+class CachedQueryEmbeddings:
+    """Serves question vectors captured at build time so runs stay offline."""
+
+    def __init__(self, questions, vectors):
+        self._vectors = {q: v for q, v in zip(questions, vectors.tolist())}
+
+    def embed_query(self, text):
+        return self._vectors[text]
+
+    def embed_documents(self, texts):
+        return [self._vectors[t] for t in texts]
+
+
+def available_chunk_sizes(namespace: str):
+    sizes = []
+    if not os.path.isdir(EMBEDDINGS_DIR):
+        return sizes
+    for name in os.listdir(EMBEDDINGS_DIR):
+        match = re.fullmatch(rf"{re.escape(namespace)}_c(\d+)\.npy", name)
+        if match:
+            sizes.append(int(match.group(1)))
+    return sorted(sizes)
+
+
+def score(docs, expected):
+    wanted = [normalize(e) for e in expected]
+    found = set()
+    first_hit = None
+    for rank, doc in enumerate(docs, start=1):
+        text = normalize(doc.page_content)
+        hits = {i for i, w in enumerate(wanted) if w in text}
+        if hits and first_hit is None:
+            first_hit = rank
+        found |= hits
+    recall = len(found) / len(wanted) if wanted else 0.0
+    return recall, (1.0 / first_hit if first_hit else 0.0)
+
+
+def run(args):
+    from langchain_core.documents import Document
+    from benchmarks.fakes import InMemoryVectorStore
+    import query
+
+    namespaces = args.namespaces or sorted(
+        os.path.splitext(f)[0] for f in os.listdir(LABELS_DIR) if f.endswith(".json")
+    )
+    rows = []
+    for namespace in namespaces:
+        pairs = load_labels(namespace)
+        q_base = os.path.join(EMBEDDINGS_DIR, f"{namespace}_queries")
+        if not os.path.exists(q_base + ".npy"):
+            print(f"skipping {namespace}: run `build` first", file=sys.stderr)
+            continue
+        with open(q_base + ".json") as f:
+            q_meta = json.load(f)
+        query.embeddings = CachedQueryEmbeddings(q_meta["questions"], np.load(q_base + ".npy"))
+
+        for chunk_size in args.chunk_sizes or available_chunk_sizes(namespace):
+            base = snapshot_path(namespace, chunk_size)
+            with open(base + ".json") as f:
+                meta = json.load(f)
+            documents = [
+                Document(page_content=t, metadata={"page": p})
+                for t, p in zip(meta["texts"], meta["pages"])
+            ]
+            store = InMemoryVectorStore(query.embeddings)
+            store.load_namespace(namespace, documents, np.load(base + ".npy"))
+            query.vector_store = store
+
+            for strategy in args.strategies:
+                for k in args.k:
+                    recalls, rrs, tokens, latencies = [], [], [], []
+                    for pair in pairs:
+                        start = time.perf_counter()
+                        docs = query.similarity_search(
+                            pair["question"], namespace=namespace, k=k,
+                            strategy=strategy, fetch_k=args.fetch_k,
+                        )
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        recall, rr = score(docs, pair["expected"])
+                        recalls.append(recall)
+                        rrs.append(rr)
+                        tokens.append(sum(estimate_tokens(d.page_content) for d in docs))
+                    rows.append({
+                        "namespace": namespace,
+                        "chunk_size": chunk_size,
+                        "strategy": strategy,
+                        "k": k,
+                        "questions": len(pairs),
+                        "recall_at_k": round(float(np.mean(recalls)), 4),
+                        "mrr": round(float(np.mean(rrs)), 4),
+                        "mean_context_tokens": round(float(np.mean(tokens)), 1),
+                        "p50_latency_ms": round(float(np.percentile(latencies, 50)), 3),
+                        "p95_latency_ms": round(float(np.percentile(latencies, 95)), 3),
+                    })
+
+    header = f"{'namespace':<14}{'chunk':>6}{'strategy':>12}{'k':>4}{'recall':>9}{'mrr':>8}{'ctx_tok':>9}{'p50ms':>9}"
+    print(header)
+    for r in rows:
+        print(
+            f"{r['namespace']:<14}{r['chunk_size']:>6}{r['strategy']:>12}{r['k']:>4}"
+            f"{r['recall_at_k']:>9.3f}{r['mrr']:>8.3f}{r['mean_context_tokens']:>9.0f}{r['p50_latency_ms']:>9.3f}"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        commit = "unknown"
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"retrieval_{commit}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    )
+    with open(output, "w") as f:
+        json.dump({"commit": commit, "results": rows}, f, indent=2)
+    print(f"Saved report to {output}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    b = sub.add_parser("build", help="chunk and embed a scripture PDF and its labelled questions")
+    b.add_argument("--namespace", required=True)
+    b.add_argument("--pdf", required=True)
+    b.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000])
+    b.add_argument("--embedder", choices=["mistral", "hash"], default="mistral")
+    b.add_argument("--batch-size", type=int, default=100)
+    b.set_defaults(func=build)
+
+    r = sub.add_parser("run", help="evaluate retrieval configurations offline")
+    r.add_argument("--namespaces", nargs="*")
+    r.add_argument("--chunk-sizes", type=int, nargs="*")
+    r.add_argument("--k", type=int, nargs="+", default=[3, 5])
+    r.add_argument("--strategies", nargs="+", choices=["similarity", "mmr"], default=["similarity", "mmr"])
+    r.add_argument("--fetch-k", type=int, default=20)
+    r.add_argument("--output")
+    r.set_defaults(func=run)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
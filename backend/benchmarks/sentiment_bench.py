@@ -0,0 +1,48 @@
+"""Throughput of the sentiment tagger, batched versus one message at a time.
+
+    python -m benchmarks.sentiment_bench --messages 100000 --batch-size 1000
+"""
+
+import argparse
+import random
+import time
+
+from sentiment import classify
+
+SAMPLES = [
+    "I am so worried about my exams and cannot sleep",
+    "Thank you, this gave me peace today",
+    "Why do I feel so lonely even with friends around?",
+    "What does the Gita say about doing my duty?",
+    "I am not happy with how my career is going",
+    "My father passed away and I am full of grief",
+    "How do I stay calm when people are rude to me?",
+    "I feel grateful but also a bit lost",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    texts = [random.choice(SAMPLES) for _ in range(args.messages)]
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        classify(texts[i : i + args.batch_size])
+    batched = time.perf_counter() - start
+
+    single_n = min(len(texts), 10000)
+    start = time.perf_counter()
+    for text in texts[:single_n]:
+        classify([text])
+    single = time.perf_counter() - start
+
+    print(f"batched ({args.batch_size}): {len(texts) / batched:,.0f} msg/s")
+    print(f"one at a time:   {single_n / single:,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
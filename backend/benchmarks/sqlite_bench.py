@@ -0,0 +1,189 @@
+"""Session sidebar query and SQLite tuning benchmark.
+
+Seeds a throwaway SQLite database, then runs concurrent sidebar readers
+while a writer keeps inserting messages, once with the default settings
+and once with SQLITE_TUNING=true. It also times the single grouped
+sidebar query against the old per-session (N+1) lookups.
+
+    python -m benchmarks.sqlite_bench --users 50 --sessions 20 --messages 40
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=20, help="sessions per user")
+    parser.add_argument("--messages", type=int, default=40, help="messages per session")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    parser.add_argument("--phase", choices=["default", "tuned"], help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)), 3) if values else None
+
+
+def seed(args):
+    from sqlalchemy import insert
+    from database import SessionLocal, sync_schema
+    from models import ChatSession, ChatMessage, PDFUpload
+
+    sync_schema()
+    with SessionLocal() as db:
+        sessions, messages, pdfs = [], [], []
+        for u in range(args.users):
+            for s in range(args.sessions):
+                sid = f"s-{u}-{s}"
+                sessions.append({"id": sid, "user_id": u, "scripture_id": "gita", "religion_id": "hinduism", "title": f"Chat {s}"})
+                for m in range(args.messages):
+                    messages.append({"session_id": sid, "role": "user" if m % 2 == 0 else "ai", "content": f"message {m} " * 20})
+                if s % 4 == 0:
+                    pdfs.append({"user_id": u, "session_id": sid, "filename": f"notes{s}.pdf", "namespace": f"user_{u}_{s}"})
+        db.execute(insert(ChatSession), sessions)
+        for i in range(0, len(messages), 10000):
+            db.execute(insert(ChatMessage), messages[i : i + 10000])
+        db.execute(insert(PDFUpload), pdfs)
+        db.commit()
+
+
+def sidebar_single(db, user_id):
+    from chat_router import session_summary_stmt
+
+    return db.execute(session_summary_stmt(user_id, "gita", "sqlite")).all()
+
+
+def sidebar_n_plus_one(db, user_id):
+    from sqlalchemy import desc, func
+    from models import ChatSession, ChatMessage, PDFUpload
+
+    sessions = (
+        db.query(ChatSession)
+        .filter(ChatSession.user_id == user_id, ChatSession.scripture_id == "gita")
+        .order_by(desc(ChatSession.created_at))
+        .all()
+    )
+    out = []
+    for s in sessions:
+        count = db.query(func.count(ChatMessage.id)).filter(ChatMessage.session_id == s.id).scalar()
+        last = (
+            db.query(ChatMessage)
+            .filter(ChatMessage.session_id == s.id)
+            .order_by(desc(ChatMessage.created_at))
+            .first()
+        )
+        pdfs = db.query(PDFUpload).filter(PDFUpload.session_id == s.id).all()
+        out.append((s, count, last, pdfs))
+    return out
+
+
+def run_phase(args):
+    from database import SessionLocal
+    from models import ChatMessage
+
+    seed(args)
+
+    with SessionLocal() as db:
+        compare = {}
+        for name, fn in [("single_query", sidebar_single), ("n_plus_one", sidebar_n_plus_one)]:
+            times = []
+            for _ in range(50):
+                start = time.perf_counter()
+                fn(db, random.randrange(args.users))
+                times.append((time.perf_counter() - start) * 1000)
+            compare[name] = {"p50_ms": pct(times, 50), "p95_ms": pct(times, 95)}
+
+    stop = time.perf_counter() + args.duration
+    read_times, write_times, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def reader():
+        with SessionLocal() as db:
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    sidebar_single(db, random.randrange(args.users))
+                    db.rollback()
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    read_times.append((time.perf_counter() - start) * 1000)
+
+    def writer():
+        with SessionLocal() as db:
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    u, s = random.randrange(args.users), random.randrange(args.sessions)
+                    db.add(ChatMessage(session_id=f"s-{u}-{s}", role="user", content="new message"))
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        errors[0] += 1
+                    continue
+                write_times.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        "sidebar": compare,
+        "concurrent": {
+            "reads": len(read_times),
+            "reads_per_s": round(len(read_times) / args.duration, 1),
+            "read_p50_ms": pct(read_times, 50),
+            "read_p95_ms": pct(read_times, 95),
+            "read_p99_ms": pct(read_times, 99),
+            "writes": len(write_times),
+            "write_p95_ms": pct(write_times, 95),
+            "errors": errors[0],
+        },
+    }
+
+
+def main():
+    args = parse_args()
+    if args.phase:
+        # Child process: configuration is read at import time, so each phase runs in its own interpreter.
+        print(json.dumps(run_phase(args)))
+        return
+
+    results = {}
+    for phase in ["default", "tuned"]:
+        workdir = tempfile.mkdtemp(prefix="secularai-sqlite-")
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            SQLITE_TUNING="true" if phase == "tuned" else "false",
+        )
+        out = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.sqlite_bench", "--phase", phase] + sys.argv[1:],
+            env=env,
+            text=True,
+        )
+        results[phase] = json.loads(out.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Lookup latency of the suggestion prefix index.
+
+Fills one scripture's index with synthetic questions and times cold
+(first) and warm (memoized) lookups for random prefixes.
+
+    python -m benchmarks.suggest_bench --questions 50000
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from suggest import PrefixIndex, SUGGEST_MIN_USERS
+
+WORDS = [
+    "how", "do", "i", "find", "peace", "what", "is", "my", "duty", "why", "does",
+    "suffering", "exist", "forgive", "someone", "deal", "with", "anger", "fear",
+    "death", "karma", "love", "work", "family", "meaning", "of", "life", "god",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    index = PrefixIndex()
+    start = time.perf_counter()
+    for _ in range(args.questions):
+        text = " ".join(random.choices(WORDS, k=random.randint(3, 9)))
+        index.add(text, random.sample(range(1000), random.randint(1, 5)), random.randint(1, 20))
+    print(f"built {len(index.keys)} questions in {time.perf_counter() - start:.2f}s")
+
+    keys = index.keys
+    prefixes = [random.choice(keys)[: random.randint(1, 12)] for _ in range(args.lookups)]
+    for label in ["cold", "warm"]:
+        if label == "cold":
+            index._top.clear()
+        timings = []
+        for prefix in prefixes:
+            t0 = time.perf_counter()
+            index.top(prefix, 5, SUGGEST_MIN_USERS)
+            timings.append((time.perf_counter() - t0) * 1e6)
+        print(
+            f"{label}: p50 {np.percentile(timings, 50):.1f}us  "
+            f"p95 {np.percentile(timings, 95):.1f}us  p99 {np.percentile(timings, 99):.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+from collections import OrderedDict
+from prometheus_client import Counter
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+
+CACHE_REQUESTS = Counter(
+    "secularai_cache_requests_total", "Cache lookups by cache name and result.", ["cache", "result"]
+)
+
+
+def make_key(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class Cache:
+    """Values must be JSON-serializable so every backend can store them."""
+
+    # True when get/set do I/O and should be kept off the event loop.
+    blocking = False
+
+    def __init__(self, name: str, max_size: int, ttl_s: float = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        CACHE_REQUESTS.labels(self.name, "hit" if hit else "miss").inc()
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl_s: float = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class LRUCache(Cache):
+    def __init__(self, name: str, max_size: int, ttl_s: float = None):
+        super().__init__(name, max_size, ttl_s)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] is not None and item[1] < time.time():
+                del self._data[key]
+                item = None
+            if item is not None:
+                self._data.move_to_end(key)
+        self._record(item is not None)
+        return item[0] if item is not None else None
+
+    def set(self, key, value, ttl_s=None):
+        ttl_s = ttl_s or self.ttl_s
+        expires_at = time.time() + ttl_s if ttl_s else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteCache(Cache):
+    """File-backed cache shared by every worker process on the host."""
+
+    blocking = True
+    _schema_lock = threading.Lock()
+
+    def __init__(self, name: str, max_size: int, ttl_s: float = None, path: str = "cache.db"):
+        super().__init__(name, max_size, ttl_s)
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        with self._schema_lock:
+            conn = self._conn()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " name TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (name, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed"
+                " ON cache_entries (name, accessed_at)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE name = ? AND key = ?",
+            (self.name, key),
+        ).fetchone()
+        if row is not None and row[1] is not None and row[1] < now:
+            conn.execute("DELETE FROM cache_entries WHERE name = ? AND key = ?", (self.name, key))
+            row = None
+        self._record(row is not None)
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE cache_entries SET accessed_at = ? WHERE name = ? AND key = ?",
+            (now, self.name, key),
+        )
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl_s=None):
+        ttl_s = ttl_s or self.ttl_s
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (name, key, value, expires_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (self.name, key, json.dumps(value), now + ttl_s if ttl_s else None, now),
+        )
+        self._sets += 1
+        # Trimming needs a count, so only do it every so often.
+        if self._sets % 100 == 0:
+            self._trim(conn)
+
+    def _trim(self, conn):
+        conn.execute(
+            "DELETE FROM cache_entries WHERE name = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE name = ?"
+            " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.name, self.name, self.max_size),
+        )
+
+    def delete(self, key):
+        self._conn().execute(
+            "DELETE FROM cache_entries WHERE name = ? AND key = ?", (self.name, key)
+        )
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, max_size: int = 1024, ttl_s: float = None) -> Cache:
+    with _caches_lock:
+        if name not in _caches:
+            if CACHE_URL.startswith("sqlite:///"):
+                _caches[name] = SQLiteCache(name, max_size, ttl_s, path=CACHE_URL[len("sqlite:///"):])
+            else:
+                _caches[name] = LRUCache(name, max_size, ttl_s)
+        return _caches[name]
+
+
+def cache_stats() -> dict:
+    with _caches_lock:
+        return {
+            name: {"hits": c.hits, "misses": c.misses, "hit_ratio": round(c.hit_ratio(), 4)}
+            for name, c in _caches.items()
+        }
@@ -1,21 +1,31 @@
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from database import get_db
-from models import ChatSession, ChatMessage, User
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, delete, func, insert
+from database import get_async_db, AsyncSessionLocal
+from models import ChatSession, ChatMessage, User, VerseCitation, PDFUpload
 from auth_router import oauth2_scheme
 from jose import jwt, JWTError
 from auth_utils import SECRET_KEY, ALGORITHM
 from typing import Optional
 from pydantic import BaseModel
 import json
+import os
+import query
+from llm_client import run_blocking
 
 router = APIRouter(prefix="/api/chat", tags=["Chat History"])
 
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "200000"))
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
 ):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -25,7 +35,9 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.username == username).first()
+    user = (
+        await db.execute(select(User).where(User.username == username))
+    ).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -62,10 +74,10 @@ class ChatMessageResponse(BaseModel):
 
 
 @router.post("/sessions")
-def create_session(
+async def create_session(
     data: ChatSessionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     session_id = str(uuid.uuid4())
     new_session = ChatSession(
@@ -76,8 +88,8 @@ def create_session(
         title=data.title,
     )
     db.add(new_session)
-    db.commit()
-    db.refresh(new_session)
+    await db.commit()
+    await db.refresh(new_session)
     return {
         "id": new_session.id,
         "scripture_id": new_session.scripture_id,
@@ -88,21 +100,95 @@ def create_session(
 
 
 @router.get("/sessions/{scripture_id}")
-def get_sessions(
+async def get_sessions(
     scripture_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     sessions = (
-        db.query(ChatSession)
-        .filter(
-            ChatSession.user_id == current_user.id,
-            ChatSession.scripture_id == scripture_id,
+        await db.execute(
+            select(ChatSession)
+            .where(
+                ChatSession.user_id == current_user.id,
+                ChatSession.scripture_id == scripture_id,
+            )
+            .order_by(desc(ChatSession.created_at))
         )
+    ).scalars().all()
+
+    return [
+        {
+            "id": s.id,
+            "scripture_id": s.scripture_id,
+            "religion_id": s.religion_id,
+            "title": s.title,
+            "created_at": s.created_at.isoformat(),
+        }
+        for s in sessions
+    ]
+
+
+SESSION_PREVIEW_CHARS = 120
+
+
+def list_agg(column, dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.string_agg(column, "\n")
+    return func.group_concat(column, "\n")
+
+
+def session_summary_stmt(user_id: int, scripture_id: str, dialect_name: str):
+    session_ids = (
+        select(ChatSession.id)
+        .where(ChatSession.user_id == user_id, ChatSession.scripture_id == scripture_id)
+        .scalar_subquery()
+    )
+    message_stats = (
+        select(
+            ChatMessage.session_id,
+            func.count(ChatMessage.id).label("message_count"),
+            func.max(ChatMessage.id).label("last_message_id"),
+        )
+        .where(ChatMessage.session_id.in_(session_ids))
+        .group_by(ChatMessage.session_id)
+        .subquery()
+    )
+    pdf_stats = (
+        select(
+            PDFUpload.session_id,
+            func.count(PDFUpload.id).label("pdf_count"),
+            list_agg(PDFUpload.filename, dialect_name).label("pdf_filenames"),
+        )
+        .where(PDFUpload.session_id.in_(session_ids))
+        .group_by(PDFUpload.session_id)
+        .subquery()
+    )
+    return (
+        select(
+            ChatSession,
+            func.coalesce(message_stats.c.message_count, 0),
+            func.substr(ChatMessage.content, 1, SESSION_PREVIEW_CHARS),
+            ChatMessage.role,
+            ChatMessage.created_at,
+            func.coalesce(pdf_stats.c.pdf_count, 0),
+            pdf_stats.c.pdf_filenames,
+        )
+        .outerjoin(message_stats, message_stats.c.session_id == ChatSession.id)
+        .outerjoin(ChatMessage, ChatMessage.id == message_stats.c.last_message_id)
+        .outerjoin(pdf_stats, pdf_stats.c.session_id == ChatSession.id)
+        .where(ChatSession.user_id == user_id, ChatSession.scripture_id == scripture_id)
         .order_by(desc(ChatSession.created_at))
-        .all()
     )
 
+
+@router.get("/sessions/{scripture_id}/summary")
+async def get_session_summaries(
+    scripture_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = session_summary_stmt(current_user.id, scripture_id, db.bind.dialect.name)
+    rows = (await db.execute(stmt)).all()
     return [
         {
             "id": s.id,
@@ -110,37 +196,61 @@ def get_sessions(
             "religion_id": s.religion_id,
             "title": s.title,
             "created_at": s.created_at.isoformat(),
+            "message_count": message_count,
+            "last_message": {
+                "role": last_role,
+                "preview": preview,
+                "created_at": last_at.isoformat() if last_at else None,
+            } if preview is not None else None,
+            "pdf_count": pdf_count,
+            "pdfs": pdf_filenames.split("\n") if pdf_filenames else [],
         }
-        for s in sessions
+        for s, message_count, preview, last_role, last_at, pdf_count, pdf_filenames in rows
     ]
 
 
 @router.get("/messages/{session_id}")
-def get_messages(
+async def get_messages(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     if session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
     messages = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.created_at)
-        .all()
-    )
+        await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at)
+        )
+    ).scalars().all()
+    citations = (
+        await db.execute(
+            select(VerseCitation.message_id, VerseCitation.reference, VerseCitation.text)
+            .where(VerseCitation.session_id == session_id)
+            .order_by(VerseCitation.id)
+        )
+    ).all()
+    verses_by_message = {}
+    for message_id, reference, text in citations:
+        verses_by_message.setdefault(message_id, []).append(
+            {"reference": reference, "text": text}
+        )
+
     return [
         {
             "id": m.id,
             "session_id": m.session_id,
             "role": m.role,
             "content": m.content,
-            "verses": json.loads(m.verses_json) if m.verses_json else None,
+            "verses": verses_by_message.get(m.id)
+            or (json.loads(m.verses_json) if m.verses_json else None),
             "sentiment": m.sentiment,
+            "imported": m.source == "import",
             "created_at": m.created_at.isoformat(),
         }
         for m in messages
@@ -148,20 +258,210 @@ def get_messages(
 
 
 @router.delete("/sessions/{session_id}")
-def delete_session(
+async def delete_session(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     if session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    db.query(ChatMessage).filter(ChatMessage.session_id == session_id).delete()
+    await db.execute(delete(ChatMessage).where(ChatMessage.session_id == session_id))
+    await db.execute(delete(VerseCitation).where(VerseCitation.session_id == session_id))
+
+    pdfs = (
+        await db.execute(select(PDFUpload).where(PDFUpload.session_id == session_id))
+    ).scalars().all()
+    for pdf in pdfs:
+        try:
+            await run_blocking(query.delete_namespace, pdf.namespace)
+        except Exception as e:
+            # Keep the row: once the session is gone it is an orphan, and the
+            # janitor's purge_orphan_pdfs retries the namespace delete.
+            print(f"Failed to delete pinecone namespace {pdf.namespace}: {e}")
+            continue
+        await db.delete(pdf)
 
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await db.commit()
 
     return {"message": "Session deleted successfully"}
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def export_history(user_id: int):
+    """Yield the user's sessions and messages as NDJSON, one batch of lines at a time.
+
+    Rows come from a server-side cursor, so memory stays flat however long
+    the history is. Each session line is followed by its messages.
+    """
+    stmt = (
+        select(
+            ChatSession.id,
+            ChatSession.scripture_id,
+            ChatSession.religion_id,
+            ChatSession.title,
+            ChatSession.created_at,
+            ChatMessage.role,
+            ChatMessage.content,
+            ChatMessage.verses_json,
+            ChatMessage.sentiment,
+            ChatMessage.model,
+            ChatMessage.source,
+            ChatMessage.created_at,
+        )
+        .outerjoin(ChatMessage, ChatMessage.session_id == ChatSession.id)
+        .where(ChatSession.user_id == user_id)
+        .order_by(ChatSession.created_at, ChatSession.id, ChatMessage.created_at, ChatMessage.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    current_session = None
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            lines = []
+            for (session_id, scripture_id, religion_id, title, session_at,
+                 role, content, verses_json, sentiment, model, source, message_at) in rows:
+                if session_id != current_session:
+                    current_session = session_id
+                    lines.append(json.dumps({
+                        "type": "session",
+                        "id": session_id,
+                        "scripture_id": scripture_id,
+                        "religion_id": religion_id,
+                        "title": title,
+                        "created_at": _iso(session_at),
+                    }))
+                if role is None:
+                    continue
+                lines.append(json.dumps({
+                    "type": "message",
+                    "session_id": session_id,
+                    "role": role,
+                    "content": content,
+                    "verses": json.loads(verses_json) if verses_json else None,
+                    "sentiment": sentiment,
+                    "model": model,
+                    "imported": source == "import",
+                    "created_at": _iso(message_at),
+                }))
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+
+async def ndjson_records(chunks, max_line_bytes: int = IMPORT_MAX_LINE_BYTES):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise HTTPException(status_code=413, detail="Import line too long")
+            if line.strip():
+                yield line
+        # Without this a body with no newline would be buffered whole.
+        if len(buffer) > max_line_bytes:
+            raise HTTPException(status_code=413, detail="Import line too long")
+    if buffer.strip():
+        yield buffer
+
+
+async def import_history(user_id: int, chunks) -> dict:
+    """Insert an NDJSON export for user_id in batched transactions.
+
+    Sessions get fresh ids so an import never touches existing data;
+    messages follow their session through the id mapping. Lines that do
+    not parse or refer to an unknown session are counted and skipped.
+    Imported messages are marked with source="import": they are shown
+    as such, left out of usage and verse rankings, and keep no
+    client-supplied model or sentiment.
+    """
+    session_ids = {}
+    sessions, messages = [], []
+    counts = {"sessions": 0, "messages": 0, "skipped": 0, "truncated": False}
+
+    async def flush(db):
+        if sessions:
+            await db.execute(insert(ChatSession), sessions)
+        if messages:
+            await db.execute(insert(ChatMessage), messages)
+        await db.commit()
+        counts["sessions"] += len(sessions)
+        counts["messages"] += len(messages)
+        sessions.clear()
+        messages.clear()
+
+    async with AsyncSessionLocal() as db:
+        async for line in ndjson_records(chunks):
+            if counts["sessions"] + counts["messages"] + len(sessions) + len(messages) >= IMPORT_MAX_ROWS:
+                counts["truncated"] = True
+                break
+            try:
+                record = json.loads(line)
+                if record["type"] == "session":
+                    new_id = str(uuid.uuid4())
+                    row = {
+                        "id": new_id,
+                        "user_id": user_id,
+                        "scripture_id": str(record["scripture_id"]),
+                        "religion_id": str(record["religion_id"]),
+                        "title": str(record.get("title") or "New Chat")[:200],
+                    }
+                    created_at = _parse_time(record.get("created_at"))
+                    if created_at:
+                        row["created_at"] = created_at
+                    sessions.append(row)
+                    session_ids[record["id"]] = new_id
+                elif record["type"] == "message" and record["session_id"] in session_ids:
+                    if record["role"] not in ("user", "ai") or not isinstance(record["content"], str):
+                        raise ValueError("bad message")
+                    verses = record.get("verses") or None
+                    if verses and not all(isinstance(v["reference"], str) and isinstance(v["text"], str) for v in verses):
+                        raise ValueError("bad verses")
+                    row = {
+                        "session_id": session_ids[record["session_id"]],
+                        "role": record["role"],
+                        "content": record["content"],
+                        "verses_json": json.dumps(verses) if verses else None,
+                        "source": "import",
+                    }
+                    created_at = _parse_time(record.get("created_at"))
+                    if created_at:
+                        row["created_at"] = created_at
+                    messages.append(row)
+                else:
+                    raise ValueError("unknown record")
+            except (ValueError, KeyError, TypeError, AttributeError):
+                counts["skipped"] += 1
+                continue
+            if len(sessions) + len(messages) >= IMPORT_BATCH_SIZE:
+                await flush(db)
+        await flush(db)
+    return counts
+
+
+@router.get("/export")
+async def export_chats(current_user: User = Depends(get_current_user)):
+    return StreamingResponse(
+        export_history(current_user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="secularai-chats.ndjson"'},
+    )
+
+
+@router.post("/import")
+async def import_chats(request: Request, current_user: User = Depends(get_current_user)):
+    return await import_history(current_user.id, request.stream())
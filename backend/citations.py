@@ -0,0 +1,125 @@
+from sqlalchemy import and_, insert
+import json
+import re
+import sys
+import time
+
+from database import SessionLocal
+from models import ChatMessage, ChatSession, VerseCitation
+from scriptures import resolve_namespace
+
+VERSE_PATTERN = re.compile(r'\[VERSE title="(.+?)"\]([\s\S]*?)\[\/VERSE\]')
+
+
+def extract_verses(reply: str):
+    verses = []
+
+    def collect(match):
+        verses.append({"reference": match.group(1), "text": match.group(2).strip()})
+        return ""
+
+    clean_text = VERSE_PATTERN.sub(collect, reply).strip()
+    return verses, clean_text
+
+
+def reference_key(reference: str) -> str:
+    return " ".join(reference.lower().split())
+
+
+def citation_rows(message_id: int, session_id: str, user_id: int, scripture_id: str, verses):
+    return [
+        {
+            "message_id": message_id,
+            "session_id": session_id,
+            "user_id": user_id,
+            # Stored as the registry namespace (e.g. "gita"), never the frontend id.
+            "scripture_id": resolve_namespace(v.get("scripture_id") or scripture_id),
+            "reference": v["reference"],
+            "reference_key": reference_key(v["reference"]),
+            "text": v["text"],
+        }
+        for v in verses
+    ]
+
+
+def normalize_scripture_ids() -> int:
+    """Rewrite citations stored under frontend ids (e.g. "bhagavad-gita") to namespaces."""
+    updated = 0
+    with SessionLocal() as db:
+        for (scripture_id,) in db.query(VerseCitation.scripture_id).distinct().all():
+            namespace = resolve_namespace(scripture_id)
+            if namespace != scripture_id:
+                updated += (
+                    db.query(VerseCitation)
+                    .filter(VerseCitation.scripture_id == scripture_id)
+                    .update({"scripture_id": namespace}, synchronize_session=False)
+                )
+        db.commit()
+    return updated
+
+
+def backfill(batch_size: int = 500):
+    """Copy verses_json into verse_citations in keyset-paginated batches.
+
+    Messages that already have citations are skipped, so the pass can be
+    stopped and re-run at any point.
+    """
+    last_id = 0
+    total_messages = total_citations = 0
+    start = time.perf_counter()
+    while True:
+        with SessionLocal() as db:
+            rows = (
+                db.query(
+                    ChatMessage.id,
+                    ChatMessage.session_id,
+                    ChatMessage.verses_json,
+                    ChatSession.user_id,
+                    ChatSession.scripture_id,
+                )
+                .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+                .outerjoin(VerseCitation, VerseCitation.message_id == ChatMessage.id)
+                .filter(
+                    and_(
+                        ChatMessage.id > last_id,
+                        ChatMessage.verses_json.isnot(None),
+                        ChatMessage.source.is_(None),  # imported replies never feed rankings
+                        VerseCitation.id.is_(None),
+                    )
+                )
+                .order_by(ChatMessage.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            batch = []
+            for message_id, session_id, verses_json, user_id, scripture_id in rows:
+                try:
+                    verses = json.loads(verses_json)
+                except ValueError:
+                    continue
+                batch.extend(citation_rows(message_id, session_id, user_id, scripture_id, verses))
+            if batch:
+                db.execute(insert(VerseCitation), batch)
+            db.commit()
+
+            last_id = rows[-1].id
+            total_messages += len(rows)
+            total_citations += len(batch)
+            print(f"backfilled up to message {last_id}: {total_messages} messages, {total_citations} citations")
+
+    elapsed = time.perf_counter() - start
+    print(f"done: {total_messages} messages, {total_citations} citations in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("usage: python citations.py backfill [batch_size]")
+        sys.exit(1)
+    from database import sync_schema
+
+    sync_schema()
+    print(f"normalized scripture ids on {normalize_scripture_ids()} citations")
+    backfill(int(sys.argv[2]) if len(sys.argv) > 2 else 500)
@@ -1,19 +1,83 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./secularai.db")
+IS_SQLITE = "sqlite" in DATABASE_URL
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Opt-in SQLite profile: WAL lets readers proceed while a writer commits.
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "false").lower() == "true"
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+pool_options = {} if IS_SQLITE and not SQLITE_TUNING else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_pre_ping": True,
+}
 
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **pool_options,
+)
+
+
+def async_database_url(url: str):
+    parsed = make_url(url)
+    connect_args = {}
+    if parsed.drivername.startswith("sqlite"):
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    elif parsed.drivername.startswith("postgres"):
+        # asyncpg takes ssl=... instead of libpq's sslmode=...
+        query = dict(parsed.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and sslmode != "disable":
+            connect_args["ssl"] = "require"
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    return parsed, connect_args
+
+
+ASYNC_DATABASE_URL, async_connect_args = async_database_url(DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=async_connect_args,
+    **pool_options,
 )
 
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.close()
+
+
+if IS_SQLITE and SQLITE_TUNING:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -23,3 +87,61 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Arbitrary constant shared by every worker so only one of them runs the DDL.
+SCHEMA_LOCK_ID = 7302451
+
+
+def sync_schema():
+    # create_all only creates missing tables, so new nullable columns and
+    # indexes on existing tables are added here. Every step checks before it
+    # creates, so a worker that loses a race simply retries and finds the work
+    # done; on Postgres the advisory lock keeps workers from racing at all.
+    is_postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as conn:
+        if is_postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SCHEMA_LOCK_ID})
+            conn.commit()
+        try:
+            for attempt in range(3):
+                try:
+                    _apply_schema(conn, is_postgres)
+                    break
+                except DBAPIError:
+                    conn.rollback()
+                    if attempt == 2:
+                        raise
+                    time.sleep(0.5)
+        finally:
+            if is_postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SCHEMA_LOCK_ID})
+                conn.commit()
+
+
+def _apply_schema(conn, is_postgres):
+    Base.metadata.create_all(bind=conn)
+    conn.commit()
+
+    inspector = inspect(conn)
+    if_not_exists = "IF NOT EXISTS " if is_postgres else ""
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(
+                text(f'ALTER TABLE {table.name} ADD COLUMN {if_not_exists}"{column.name}" {col_type}')
+            )
+    conn.commit()
+
+    for table in Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            idx.create(bind=conn, checkfirst=True)
+    conn.commit()
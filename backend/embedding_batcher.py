@@ -0,0 +1,106 @@
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from langchain_core.embeddings import Embeddings
+from prometheus_client import Histogram
+import os
+import queue
+import threading
+import time
+
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_INFLIGHT = int(os.getenv("EMBED_MAX_INFLIGHT", "4"))
+EMBED_TIMEOUT_S = float(os.getenv("EMBED_TIMEOUT_S", "30"))
+
+BATCH_SIZE = Histogram(
+    "secularai_embedding_batch_size",
+    "Query texts per batched embedding call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+QUEUE_DELAY = Histogram(
+    "secularai_embedding_queue_delay_seconds",
+    "Time a query waited for its batch to be dispatched.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+
+class BatchedEmbeddings(Embeddings):
+    """Collects concurrent embed_query calls into batched embed_documents calls."""
+
+    def __init__(self, inner: Embeddings, window_ms: float = EMBED_BATCH_WINDOW_MS, max_batch: int = EMBED_MAX_BATCH):
+        self.inner = inner
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=EMBED_MAX_INFLIGHT, thread_name_prefix="embed-batch")
+        self._slots = threading.Semaphore(EMBED_MAX_INFLIGHT)
+        self._collector = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        return self.inner.embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        return await self.inner.aembed_documents(texts)
+
+    def embed_query(self, text):
+        if self.window_s <= 0 or self.max_batch <= 1:
+            return self.inner.embed_query(text)
+        self._ensure_collector()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        try:
+            return future.result(timeout=EMBED_TIMEOUT_S)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def _ensure_collector(self):
+        if self._collector is not None:
+            return
+        with self._lock:
+            if self._collector is None:
+                self._collector = threading.Thread(
+                    target=self._collect, name="embed-collector", daemon=True
+                )
+                self._collector.start()
+
+    def _collect(self):
+        while True:
+            # Wait for a free dispatch slot before draining, so that under load
+            # queued queries merge into larger batches instead of piling up
+            # as many small ones.
+            self._slots.acquire()
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._pool.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        try:
+            now = time.perf_counter()
+            for _, _, enqueued in batch:
+                QUEUE_DELAY.observe(now - enqueued)
+
+            # Callers that timed out cancelled their futures; skip their texts.
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                return
+            unique = list(dict.fromkeys(text for text, _, _ in batch))
+            BATCH_SIZE.observe(len(unique))
+            try:
+                vectors = dict(zip(unique, self.inner.embed_documents(unique)))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                return
+            for text, future, _ in batch:
+                future.set_result(vectors[text])
+        finally:
+            self._slots.release()
@@ -0,0 +1,174 @@
+from fastapi import HTTPException
+from prometheus_client import Counter
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+import time
+
+from database import AsyncSessionLocal
+from models import IdempotencyKey
+from llm_client import LLM_DEADLINE_S
+
+IDEMPOTENCY_TTL_S = float(os.getenv("IDEMPOTENCY_TTL_S", "86400"))
+# How long a retry waits for the original request before giving up with 409.
+IDEMPOTENCY_WAIT_S = float(os.getenv("IDEMPOTENCY_WAIT_S", str(LLM_DEADLINE_S + 15)))
+# A pending key older than this belongs to a worker that died; the next retry takes it over.
+IDEMPOTENCY_STALE_S = float(os.getenv("IDEMPOTENCY_STALE_S", str(LLM_DEADLINE_S * 2 + 30)))
+IDEMPOTENCY_POLL_S = float(os.getenv("IDEMPOTENCY_POLL_S", "0.5"))
+MAX_KEY_LENGTH = 255
+
+REPLAYS = Counter(
+    "secularai_idempotency_replays_total",
+    "Requests answered from an earlier request with the same Idempotency-Key.",
+    ["outcome"],
+)
+
+
+class IdempotentRequests:
+    """Runs a handler once per (session, Idempotency-Key) and replays its response.
+
+    Retries that arrive while the first request is still running wait for it:
+    on the same worker through an in-process future, across workers by
+    polling the row until it is marked done.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def run(self, session_id: str, key: str, request_hash: str, handler):
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        deadline = time.monotonic() + IDEMPOTENCY_WAIT_S
+        while True:
+            async with AsyncSessionLocal() as db:
+                row = await self._claim(db, session_id, key, request_hash)
+            if row is None:
+                break
+            if row.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request",
+                )
+            if row.status == "done":
+                REPLAYS.labels("stored").inc()
+                return json.loads(row.response_json)
+            response = await self._wait(session_id, key, deadline)
+            if response is not None:
+                REPLAYS.labels("waited").inc()
+                return response
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                )
+            # The original failed or was abandoned; try to claim the key ourselves.
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[(session_id, key)] = future
+        try:
+            response = await handler()
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.session_id == session_id, IdempotencyKey.key == key)
+                    .values(status="done", response_json=json.dumps(response))
+                )
+                await db.commit()
+            future.set_result(response)
+            return response
+        except BaseException:
+            # Release the key so a retry can run the request again.
+            await self._release(session_id, key)
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop((session_id, key), None)
+
+    async def _claim(self, db, session_id, key, request_hash):
+        """Returns None when this caller now owns the key, else the existing row."""
+        now = datetime.utcnow()
+        db.add(IdempotencyKey(
+            session_id=session_id,
+            key=key,
+            request_hash=request_hash,
+            status="pending",
+            locked_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_S),
+        ))
+        try:
+            await db.commit()
+            return None
+        except IntegrityError:
+            await db.rollback()
+
+        row = (
+            await db.execute(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.session_id == session_id, IdempotencyKey.key == key
+                )
+            )
+        ).scalar_one_or_none()
+        if row is None:
+            # Released or purged between our insert and the lookup.
+            return await self._claim(db, session_id, key, request_hash)
+
+        stale_before = now - timedelta(seconds=IDEMPOTENCY_STALE_S)
+        if row.status == "pending" and row.request_hash == request_hash and row.locked_at < stale_before:
+            taken = await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.id == row.id, IdempotencyKey.locked_at == row.locked_at)
+                .values(locked_at=now)
+            )
+            await db.commit()
+            if taken.rowcount == 1:
+                REPLAYS.labels("takeover").inc()
+                return None
+        return row
+
+    async def _wait(self, session_id, key, deadline):
+        future = self._inflight.get((session_id, key))
+        if future is not None:
+            try:
+                return await asyncio.wait_for(
+                    asyncio.shield(future), max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                return None
+
+        # The original is running on another worker.
+        while time.monotonic() < deadline:
+            await asyncio.sleep(IDEMPOTENCY_POLL_S)
+            async with AsyncSessionLocal() as db:
+                row = (
+                    await db.execute(
+                        select(IdempotencyKey.status, IdempotencyKey.response_json).where(
+                            IdempotencyKey.session_id == session_id, IdempotencyKey.key == key
+                        )
+                    )
+                ).first()
+            if row is None:
+                return None
+            if row.status == "done":
+                return json.loads(row.response_json)
+        return None
+
+    async def _release(self, session_id, key):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    delete(IdempotencyKey).where(
+                        IdempotencyKey.session_id == session_id,
+                        IdempotencyKey.key == key,
+                        IdempotencyKey.status == "pending",
+                    )
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"[idempotency] failed to release key {key}: {e}")
+
+
+idempotent_queries = IdempotentRequests()
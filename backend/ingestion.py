@@ -1,5 +1,4 @@
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pdf_stream import PdfStream
 from langchain_mistralai import MistralAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
@@ -26,21 +25,13 @@ def process_pdfs():
     for file_path in pdf_files:
         try:
             namespace = os.path.splitext(os.path.basename(file_path))[0].lower()
-            loader = PyPDFLoader(file_path)
-            documents = loader.load()
-
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000, chunk_overlap=100, separators=["\n\n", "\n", " ", ""]
-            )
-            texts = text_splitter.split_documents(documents)
-
-            batch_size = 100
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i : i + batch_size]
+            stream = PdfStream(file_path, batch_size=100)
+            for batch in stream:
                 batch_uuids = [str(uuid4()) for _ in range(len(batch))]
                 vector_store.add_documents(
                     documents=batch, ids=batch_uuids, namespace=namespace
                 )
+            print(f"[OK] {namespace}: {stream.report()}")
 
         except Exception as e:
             print(f"[ERROR] Processing {file_path}: {e}")
@@ -1,20 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from collections import Counter
 from datetime import datetime, timedelta
+import asyncio
 import json
-from groq import Groq
-import os
+import time
 
-from database import get_db
-from models import User, ChatSession, ChatMessage, UserInsight
+from database import get_async_db
+from models import User, ChatSession, ChatMessage, UserInsight, InsightUsage
 from chat_router import get_current_user
+from llm_client import LLMClient, run_blocking
+import sentiment
 
 router = APIRouter(prefix="/api/insights", tags=["Soul Snapshot"])
 
-groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+groq_client = LLMClient()
 
 SYSTEM_PROMPT = (
-    'Analyze these questions and output ONLY valid JSON with no extra text: '
+    'Analyze these questions and the mood of all their messages and output ONLY valid JSON with no extra text: '
     '{"archetype":"2-3 word label","raw_take":"2 short sentences. '
     'Write directly to the user as YOU. Simple words that anyone can understand. '
     'Say what their questions actually show about what they are going through right now. '
@@ -25,11 +29,13 @@ SYSTEM_PROMPT = (
 
 
 @router.get("/me")
-def get_my_insight(
+async def get_my_insight(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    insight = db.query(UserInsight).filter(UserInsight.user_id == current_user.id).first()
+    insight = (
+        await db.execute(select(UserInsight).where(UserInsight.user_id == current_user.id))
+    ).scalar_one_or_none()
     if not insight:
         return {"insight": None}
 
@@ -45,12 +51,14 @@ def get_my_insight(
 
 
 @router.post("/generate")
-def generate_insight(
+async def generate_insight(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check 24-hour rate limit
-    existing = db.query(UserInsight).filter(UserInsight.user_id == current_user.id).first()
+    existing = (
+        await db.execute(select(UserInsight).where(UserInsight.user_id == current_user.id))
+    ).scalar_one_or_none()
     if existing:
         time_since = datetime.utcnow() - existing.generated_at.replace(tzinfo=None)
         if time_since < timedelta(hours=24):
@@ -61,40 +69,64 @@ def generate_insight(
             )
 
     # Collect all user messages across all sessions
-    user_sessions = db.query(ChatSession).filter(ChatSession.user_id == current_user.id).all()
-    session_ids = [s.id for s in user_sessions]
+    session_ids = (
+        await db.execute(select(ChatSession.id).where(ChatSession.user_id == current_user.id))
+    ).scalars().all()
 
     if not session_ids:
         raise HTTPException(status_code=400, detail="no_messages")
 
     user_messages = (
-        db.query(ChatMessage)
-        .filter(
-            ChatMessage.session_id.in_(session_ids),
-            ChatMessage.role == "user"
+        await db.execute(
+            select(ChatMessage)
+            .where(
+                ChatMessage.session_id.in_(session_ids),
+                ChatMessage.role == "user"
+            )
+            .order_by(ChatMessage.created_at)
         )
-        .order_by(ChatMessage.created_at)
-        .all()
-    )
+    ).scalars().all()
 
     if len(user_messages) < 5:
         raise HTTPException(status_code=400, detail="no_messages")
 
-    # Build minimal token-efficient question list (max 30, trimmed to 100 chars each)
-    questions = [m.content[:100].strip() for m in user_messages[-30:]]
+    # Mood comes from the precomputed tags; anything not tagged yet is scored
+    # locally, off the event loop.
+    untagged = [m.content for m in user_messages if m.sentiment is None]
+    moods = Counter(m.sentiment for m in user_messages if m.sentiment is not None)
+    if untagged:
+        moods.update(await asyncio.to_thread(sentiment.classify, untagged))
+    mood_str = ", ".join(
+        f"{label} {round(100 * count / len(user_messages))}%" for label, count in moods.most_common()
+    )
+
+    # The mood breakdown covers the emotional read, so only a few recent
+    # questions go along for topics (max 10, trimmed to 80 chars each).
+    questions = [m.content[:80].strip() for m in user_messages[-10:]]
     questions_str = "; ".join(questions)
 
     # Call Groq with minimal prompt
+    usage = None
     try:
-        response = groq_client.chat.completions.create(
+        llm_start = time.perf_counter()
+        response = await run_blocking(
+            groq_client.complete,
             model="llama-3.1-8b-instant",  # smallest fast model to save tokens
+            fallback_model=None,
             temperature=0.5,
             max_tokens=160,
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": f"Questions: {questions_str}"}
+                {"role": "user", "content": f"Mood: {mood_str}\nQuestions: {questions_str}"}
             ]
         )
+        llm_ms = (time.perf_counter() - llm_start) * 1000
+        usage = {
+            "model": response.model,
+            "prompt_tokens": response.usage.prompt_tokens if response.usage else None,
+            "completion_tokens": response.usage.completion_tokens if response.usage else None,
+            "llm_ms": llm_ms,
+        }
         raw = response.choices[0].message.content.strip()
         # Strip markdown code fences if present
         if raw.startswith("```"):
@@ -104,6 +136,10 @@ def generate_insight(
         data = json.loads(raw)
     except Exception as e:
         print("Insight generation error:", e)
+        if usage:
+            # The tokens were spent even though the reply was unusable.
+            db.add(InsightUsage(user_id=current_user.id, **usage))
+            await db.commit()
         raise HTTPException(status_code=500, detail="Failed to generate insight. Please try again.")
 
     # Validate expected fields
@@ -111,25 +147,30 @@ def generate_insight(
     raw_take = data.get("raw_take", "")
     tags = data.get("tags", [])
 
+    db.add(InsightUsage(user_id=current_user.id, **usage))
+
     # Upsert (update if exists, create if not)
     if existing:
         existing.archetype = archetype
         existing.raw_take = raw_take
         existing.tags_json = json.dumps(tags)
         existing.generated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing)
+        for field, value in usage.items():
+            setattr(existing, field, value)
+        await db.commit()
+        await db.refresh(existing)
     else:
         new_insight = UserInsight(
             user_id=current_user.id,
             archetype=archetype,
             raw_take=raw_take,
             tags_json=json.dumps(tags),
-            generated_at=datetime.utcnow()
+            generated_at=datetime.utcnow(),
+            **usage
         )
         db.add(new_insight)
-        db.commit()
-        db.refresh(new_insight)
+        await db.commit()
+        await db.refresh(new_insight)
 
     return {
         "insight": {
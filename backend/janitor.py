@@ -0,0 +1,183 @@
+from prometheus_client import Counter, Gauge, Histogram
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+import argparse
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+
+from database import SessionLocal
+from models import PendingUser, PasswordReset, PDFUpload, ChatSession, IdempotencyKey, JobLease
+import query
+from session_index import session_index, PDF_NAMESPACE_PREFIX
+
+JANITOR_ENABLED = os.getenv("JANITOR_ENABLED", "true").lower() == "true"
+JANITOR_INTERVAL_S = float(os.getenv("JANITOR_INTERVAL_S", "900"))
+JANITOR_BATCH_SIZE = int(os.getenv("JANITOR_BATCH_SIZE", "500"))
+JANITOR_DRY_RUN = os.getenv("JANITOR_DRY_RUN", "false").lower() == "true"
+# Deleting vector namespaces trusts this database to know every upload, which a
+# fresh local DB pointed at the shared Pinecone index does not. Opt in explicitly.
+JANITOR_RECONCILE_NAMESPACES = os.getenv("JANITOR_RECONCILE_NAMESPACES", "false").lower() == "true"
+JANITOR_MAX_NAMESPACE_DELETES = int(os.getenv("JANITOR_MAX_NAMESPACE_DELETES", "20"))
+
+LEASE_HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+DELETED = Counter(
+    "secularai_janitor_deleted_total",
+    "Rows or namespaces removed (or found, in dry-run) by the janitor.",
+    ["task", "dry_run"],
+)
+RUN_SECONDS = Histogram("secularai_janitor_run_seconds", "Janitor task duration.", ["task"])
+LAST_RUN = Gauge("secularai_janitor_last_run_timestamp", "Unix time of the last janitor run.")
+
+
+def purge_expired(model, dry_run: bool, batch_size: int = JANITOR_BATCH_SIZE) -> int:
+    now = datetime.utcnow()
+    total = 0
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            ids = [
+                row.id
+                for row in db.query(model.id)
+                .filter(model.expires_at < now, model.id > last_id)
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            ]
+            if not ids:
+                break
+            last_id = ids[-1]
+            if not dry_run:
+                db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                db.commit()
+        total += len(ids)
+    return total
+
+
+def purge_orphan_pdfs(dry_run: bool) -> int:
+    with SessionLocal() as db:
+        orphans = (
+            db.query(PDFUpload)
+            .outerjoin(ChatSession, ChatSession.id == PDFUpload.session_id)
+            .filter(ChatSession.id.is_(None))
+            .all()
+        )
+        if dry_run:
+            return len(orphans)
+        for pdf in orphans:
+            try:
+                query.delete_namespace(pdf.namespace)
+            except Exception as e:
+                print(f"[janitor] failed to delete namespace {pdf.namespace}: {e}")
+                continue
+            db.delete(pdf)
+        db.commit()
+        return len(orphans)
+
+
+def reconcile_namespaces(dry_run: bool) -> int:
+    remote = {
+        ns
+        for ns in query.list_namespaces() | session_index.list_namespaces()
+        if ns.startswith(PDF_NAMESPACE_PREFIX)
+    }
+    if not remote:
+        return 0
+    with SessionLocal() as db:
+        if not db.query(PDFUpload.id).first():
+            print(f"[janitor] no PDF uploads in this database; not touching {len(remote)} namespaces")
+            return 0
+        known = {
+            row.namespace
+            for row in db.query(PDFUpload.namespace)
+            .filter(PDFUpload.namespace.in_(remote))
+            .all()
+        }
+    stale = remote - known
+    if not JANITOR_RECONCILE_NAMESPACES:
+        dry_run = True
+    if len(stale) > JANITOR_MAX_NAMESPACE_DELETES:
+        print(
+            f"[janitor] {len(stale)} unknown namespaces exceeds "
+            f"JANITOR_MAX_NAMESPACE_DELETES={JANITOR_MAX_NAMESPACE_DELETES}; not deleting"
+        )
+        dry_run = True
+    if not dry_run:
+        for ns in stale:
+            try:
+                query.delete_namespace(ns)
+            except Exception as e:
+                print(f"[janitor] failed to delete namespace {ns}: {e}")
+    return len(stale)
+
+
+TASKS = {
+    "pending_users": lambda dry_run: purge_expired(PendingUser, dry_run),
+    "password_resets": lambda dry_run: purge_expired(PasswordReset, dry_run),
+    "idempotency_keys": lambda dry_run: purge_expired(IdempotencyKey, dry_run),
+    "orphan_pdfs": purge_orphan_pdfs,
+    "vector_namespaces": reconcile_namespaces,
+}
+
+
+def run_once(dry_run: bool = JANITOR_DRY_RUN) -> dict:
+    results = {}
+    for name, task in TASKS.items():
+        start = time.perf_counter()
+        try:
+            results[name] = task(dry_run)
+            DELETED.labels(name, str(dry_run).lower()).inc(results[name])
+        except Exception as e:
+            print(f"[janitor] {name} failed: {e}")
+            results[name] = None
+        RUN_SECONDS.labels(name).observe(time.perf_counter() - start)
+    LAST_RUN.set_to_current_time()
+    return results
+
+
+def acquire_lease(name: str, ttl_s: float) -> bool:
+    """Take or renew a named lease in the database; False if another process holds it."""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_s)
+    with SessionLocal() as db:
+        taken = (
+            db.query(JobLease)
+            .filter(
+                JobLease.name == name,
+                or_(JobLease.holder == LEASE_HOLDER, JobLease.expires_at < now),
+            )
+            .update({"holder": LEASE_HOLDER, "expires_at": expires_at}, synchronize_session=False)
+        )
+        if taken:
+            db.commit()
+            return True
+        if db.query(func.count(JobLease.name)).filter(JobLease.name == name).scalar():
+            return False
+        db.add(JobLease(name=name, holder=LEASE_HOLDER, expires_at=expires_at))
+        try:
+            db.commit()
+            return True
+        except IntegrityError:
+            return False
+
+
+async def run_forever():
+    # Jitter so several workers do not all sweep at the same moment.
+    await asyncio.sleep(random.uniform(0, min(60, JANITOR_INTERVAL_S)))
+    while True:
+        # Only the worker holding the lease sweeps; it renews it every run.
+        if await asyncio.to_thread(acquire_lease, "janitor", JANITOR_INTERVAL_S * 2):
+            await asyncio.to_thread(run_once)
+        await asyncio.sleep(JANITOR_INTERVAL_S)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the maintenance janitor once.")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    print(run_once(dry_run=args.dry_run or JANITOR_DRY_RUN))
@@ -0,0 +1,216 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from prometheus_client import Counter, Gauge
+from functools import partial
+from groq import Groq
+import anyio
+import groq
+import httpx
+import os
+import random
+import threading
+import time
+
+from metrics import timed
+
+FALLBACK_MODEL = "llama-3.1-8b-instant"
+
+LLM_DEADLINE_S = float(os.getenv("LLM_DEADLINE_S", "30"))
+LLM_CALL_TIMEOUT_S = float(os.getenv("LLM_CALL_TIMEOUT_S", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.25"))
+LLM_BACKOFF_CAP_S = float(os.getenv("LLM_BACKOFF_CAP_S", "2"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+# 0 disables hedging; otherwise a fallback request is raced after this delay.
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "0"))
+# Part of the deadline kept back so the fallback model still gets a chance.
+LLM_FALLBACK_RESERVE_S = float(os.getenv("LLM_FALLBACK_RESERVE_S", "8"))
+
+# Threads for blocking retrieval + generation work, separate from Starlette's
+# default threadpool so slow completions cannot starve sync routes.
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "256"))
+
+RETRYABLE_ERRORS = (
+    groq.APITimeoutError,
+    groq.APIConnectionError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+
+BREAKER_STATE = Gauge(
+    "secularai_llm_breaker_state",
+    "Circuit breaker state per model (0 closed, 1 half-open, 2 open).",
+    ["model"],
+)
+LLM_RETRIES = Counter("secularai_llm_retries_total", "Retried LLM calls.", ["model"])
+LLM_FALLBACKS = Counter(
+    "secularai_llm_fallbacks_total", "Replies served by the fallback model.", ["reason"]
+)
+LLM_HEDGES = Counter(
+    "secularai_llm_hedges_total", "Hedged LLM requests by winner.", ["winner"]
+)
+LLM_FAILURES = Counter("secularai_llm_failures_total", "Failed LLM calls.", ["model"])
+
+
+class LLMUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, model: str, failure_threshold: int, reset_timeout_s: float):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(model).set(self.state)
+
+    def _set_state(self, state):
+        self.state = state
+        BREAKER_STATE.labels(self.model).set(state)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            # Half-open lets a single probe through.
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def release(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._probe_in_flight = False
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+# Every hedged completion occupies up to two threads (primary + hedge), so size
+# the pool from LLM_WORKERS; a smaller pool would quietly cap LLM concurrency
+# and let queued primaries burn their deadline before starting. Threads are
+# only created on demand.
+_hedge_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LLM_HEDGE_WORKERS", str(2 * LLM_WORKERS))), thread_name_prefix="llm-hedge"
+)
+
+
+_llm_limiter = None
+
+
+async def run_blocking(fn, *args, **kwargs):
+    global _llm_limiter
+    if _llm_limiter is None:
+        _llm_limiter = anyio.CapacityLimiter(LLM_WORKERS)
+    return await anyio.to_thread.run_sync(partial(fn, *args, **kwargs), limiter=_llm_limiter)
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(
+                model, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_S
+            )
+        return _breakers[model]
+
+
+class LLMClient:
+    def __init__(self, client: Groq = None):
+        self.client = client or Groq(
+            api_key=os.environ.get("GROQ_API_KEY"),
+            timeout=LLM_CALL_TIMEOUT_S,
+            max_retries=0,
+            # httpx defaults to 100 connections, which would cap LLM_WORKERS.
+            http_client=groq.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=LLM_WORKERS, max_keepalive_connections=32)
+            ),
+        )
+
+    def _call_with_retries(self, model: str, deadline: float, **params):
+        breaker = get_breaker(model)
+        last_error = None
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not breaker.allow():
+                raise LLMUnavailable(f"circuit open for {model}")
+            try:
+                with timed("llm", model):
+                    response = self.client.with_options(
+                        timeout=min(LLM_CALL_TIMEOUT_S, remaining)
+                    ).chat.completions.create(model=model, **params)
+                breaker.record_success()
+                return response
+            except RETRYABLE_ERRORS as e:
+                breaker.record_failure()
+                LLM_FAILURES.labels(model).inc()
+                last_error = e
+            except Exception:
+                # Bad requests will not get better on retry and say nothing about health.
+                breaker.release()
+                raise
+            if attempt < LLM_MAX_RETRIES:
+                LLM_RETRIES.labels(model).inc()
+                backoff = random.uniform(0, min(LLM_BACKOFF_CAP_S, LLM_BACKOFF_BASE_S * 2 ** attempt))
+                time.sleep(max(0.0, min(backoff, deadline - time.monotonic())))
+        raise LLMUnavailable(f"{model} failed: {last_error}")
+
+    def _hedged(self, model: str, fallback_model: str, deadline: float, **params):
+        primary = _hedge_pool.submit(self._call_with_retries, model, deadline, **params)
+        done, _ = wait([primary], timeout=LLM_HEDGE_AFTER_S)
+        if done and primary.exception() is None:
+            return primary.result()
+
+        hedge = _hedge_pool.submit(self._call_with_retries, fallback_model, deadline, **params)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    winner = "primary" if future is primary else "fallback"
+                    LLM_HEDGES.labels(winner).inc()
+                    if winner == "fallback":
+                        LLM_FALLBACKS.labels("hedge").inc()
+                    return future.result()
+        raise LLMUnavailable(f"{model} and {fallback_model} both failed")
+
+    def complete(self, model: str, fallback_model: str = FALLBACK_MODEL, deadline_s: float = None, **params):
+        deadline = time.monotonic() + (deadline_s or LLM_DEADLINE_S)
+        if not fallback_model or fallback_model == model:
+            return self._call_with_retries(model, deadline, **params)
+
+        if LLM_HEDGE_AFTER_S > 0 and get_breaker(model).state == CircuitBreaker.CLOSED:
+            return self._hedged(model, fallback_model, deadline, **params)
+
+        try:
+            return self._call_with_retries(model, deadline - LLM_FALLBACK_RESERVE_S, **params)
+        except LLMUnavailable as e:
+            reason = "breaker_open" if "circuit open" in str(e) else "error"
+            LLM_FALLBACKS.labels(reason).inc()
+            return self._call_with_retries(fallback_model, deadline, **params)
@@ -1,19 +1,47 @@
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
 from pydantic import BaseModel
 import os
-import re
 import json
-from database import engine, get_db
+import time
+import random
+import logging
+import asyncio
+from database import engine, async_engine, AsyncSessionLocal, sync_schema
 import models
 from auth_router import router as auth_router
-from chat_router import router as chat_router
+from chat_router import router as chat_router, get_current_user
 from pdf_router import router as pdf_router
 from insights_router import router as insights_router
-from query import get_ai_reply
+from usage_router import router as usage_router
+from verses_router import router as verses_router
+from query import get_ai_reply, get_comparative_reply, REPLY_MODEL, COMPARE_MAX_SCRIPTURES
+from scriptures import resolve_namespace, find as find_scripture
+from typing import Optional
+from citations import extract_verses, citation_rows, normalize_scripture_ids
+from singleflight import SingleFlight, normalize_query
+from cache import get_cache, make_key
+from idempotency import idempotent_queries
+from llm_client import run_blocking
+import metrics
+import janitor
+import sentiment
+import suggest
 
-models.Base.metadata.create_all(bind=engine)
+sync_schema()
+normalize_scripture_ids()
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+metrics.instrument_pool(engine, "sync")
+metrics.instrument_pool(async_engine.sync_engine, "async")
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+request_logger = logging.getLogger("secularai.requests")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
 
 app = FastAPI(title="SecularAI API")
 
@@ -41,15 +69,49 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def log_cors_details(request: Request, call_next):
-    origin = request.headers.get("origin")
-    method = request.method
-    path = request.url.path
-    if origin:
-        print(f"DEBUG: Incoming {method} request to {path} from Origin: {origin}")
+@app.on_event("startup")
+async def start_background_jobs():
+    if janitor.JANITOR_ENABLED:
+        app.state.janitor_task = asyncio.create_task(janitor.run_forever())
+    if sentiment.SENTIMENT_ENABLED:
+        app.state.sentiment_task = asyncio.create_task(sentiment.run_forever())
+    if suggest.SUGGEST_ENABLED:
+        app.state.suggest_task = asyncio.create_task(suggest.run_forever())
+
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    await async_engine.dispose()
 
+
+@app.on_event("shutdown")
+def save_suggestions():
+    if suggest.SUGGEST_ENABLED:
+        try:
+            suggest.suggestions.save()
+        except Exception as e:
+            print(f"[suggest] snapshot save failed: {e}")
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    start = time.perf_counter()
     response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    route_path = route.path if route else "unmatched"
+    metrics.observe_request(request.method, route_path, response.status_code, elapsed)
+
+    if request_logger.isEnabledFor(logging.DEBUG) and random.random() < LOG_SAMPLE_RATE:
+        request_logger.debug(json.dumps({
+            "method": request.method,
+            "path": request.url.path,
+            "route": route_path,
+            "origin": request.headers.get("origin"),
+            "status": response.status_code,
+            "ms": round(elapsed * 1000, 1),
+        }))
     return response
 
 
@@ -57,73 +119,194 @@ app.include_router(auth_router)
 app.include_router(chat_router)
 app.include_router(pdf_router)
 app.include_router(insights_router)
+app.include_router(usage_router)
+app.include_router(verses_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    body, content_type = metrics.render_latest()
+    return Response(content=body, media_type=content_type)
+
+
+first_question_flights = SingleFlight("first_question")
+answer_cache = get_cache(
+    "first_answers",
+    max_size=int(os.getenv("ANSWER_CACHE_SIZE", "5000")),
+    ttl_s=float(os.getenv("ANSWER_CACHE_TTL_S", "21600")),
+)
+
+
+async def cache_call(fn, *args):
+    if answer_cache.blocking:
+        return await run_blocking(fn, *args)
+    return fn(*args)
 
 
 class QueryRequest(BaseModel):
     user_query: str
     religion: str = "hinduism"
     scripture: str = "gita"
+    # Two or more scriptures switch to a single comparative answer.
+    scriptures: Optional[list[str]] = None
     session_id: str
 
 
+@app.get("/suggest")
+async def suggest_questions(
+    q: str,
+    scripture: str = "gita",
+    limit: int = 5,
+    _: models.User = Depends(get_current_user),
+):
+    # In-memory lookup only, so it stays on the event loop.
+    return {"suggestions": suggest.suggestions.suggest(scripture, q, limit)}
+
+
+def normalize_scriptures(request: QueryRequest):
+    if not request.scriptures:
+        return
+    # Different spellings of one scripture resolve to the same namespace.
+    unique = {}
+    for scripture in request.scriptures:
+        unique.setdefault(resolve_namespace(scripture), scripture)
+    if len(unique) > COMPARE_MAX_SCRIPTURES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {COMPARE_MAX_SCRIPTURES} scriptures can be compared at once",
+        )
+    if len(unique) == 1:
+        request.scripture = next(iter(unique.values()))
+        request.scriptures = None
+    else:
+        request.scriptures = list(unique.values())
+
+
 @app.post("/query")
-def query_scripture(request: QueryRequest, db: Session = Depends(get_db)):
-    session = (
-        db.query(models.ChatSession)
-        .filter(models.ChatSession.id == request.session_id)
-        .first()
+async def query_scripture(
+    request: QueryRequest,
+    idempotency_key: Optional[str] = Header(None),
+):
+    normalize_scriptures(request)
+    if not idempotency_key:
+        return await answer_query(request)
+    # Retries of the same request (e.g. after a client timeout) replay the first answer.
+    request_hash = make_key(
+        request.user_query, request.religion, request.scripture, request.scriptures
     )
-    if not session:
-        return {"error": "Session not found"}
-
-    past_messages = (
-        db.query(models.ChatMessage)
-        .filter(models.ChatMessage.session_id == request.session_id)
-        .order_by(models.ChatMessage.created_at)
-        .all()
+    return await idempotent_queries.run(
+        request.session_id,
+        idempotency_key,
+        request_hash,
+        lambda: answer_query(request),
     )
 
+
+async def answer_query(request: QueryRequest):
+    # Each phase opens its own short session so no pooled connection is held
+    # across retrieval and generation, which can take several seconds.
+    async with AsyncSessionLocal() as db:
+        session = await db.get(models.ChatSession, request.session_id)
+        if not session:
+            return {"error": "Session not found"}
+
+        past_messages = (
+            await db.execute(
+                select(models.ChatMessage)
+                .where(models.ChatMessage.session_id == request.session_id)
+                .order_by(models.ChatMessage.created_at.desc(), models.ChatMessage.id.desc())
+                .limit(14)
+            )
+        ).scalars().all()
+
+        pdf_namespaces = (
+            await db.execute(
+                select(models.PDFUpload.namespace)
+                .where(models.PDFUpload.session_id == request.session_id)
+            )
+        ).scalars().all()
+
+        db.add(models.ChatMessage(
+            session_id=request.session_id, role="user", content=request.user_query
+        ))
+        await db.commit()
+
     history_text = ""
-    for msg in past_messages[-14:]:
+    for msg in reversed(past_messages):
         role = "User" if msg.role == "user" else "Guide"
         history_text += f"{role}: {msg.content}\n"
 
-    user_msg = models.ChatMessage(
-        session_id=request.session_id, role="user", content=request.user_query
-    )
-    db.add(user_msg)
-    db.commit()
-
-    pdfs = db.query(models.PDFUpload).filter(models.PDFUpload.session_id == request.session_id).all()
-    pdf_namespaces = [pdf.namespace for pdf in pdfs]
-
-    reply = get_ai_reply(
-        request.user_query,
-        history_text,
-        religion=request.religion,
-        scripture=request.scripture,
-        pdf_namespaces=pdf_namespaces,
-    )
+    scriptures = request.scriptures or [request.scripture]
+    comparative = len(scriptures) > 1
 
-    verses_data = []
+    async def generate():
+        if comparative:
+            return await run_blocking(
+                get_comparative_reply,
+                request.user_query,
+                history_text,
+                scriptures=scriptures,
+                pdf_namespaces=pdf_namespaces,
+            )
+        return await run_blocking(
+            get_ai_reply,
+            request.user_query,
+            history_text,
+            religion=request.religion,
+            scripture=scriptures[0],
+            pdf_namespaces=pdf_namespaces,
+        )
 
-    def extract_verses(match):
-        verses_data.append(
-            {"reference": match.group(1), "text": match.group(2).strip()}
+    if history_text or pdf_namespaces:
+        reply, usage = await generate()
+    else:
+        # Identical opening questions share one retrieval + generation.
+        key = (
+            tuple(resolve_namespace(s) for s in scriptures),
+            tuple(scriptures),
+            request.religion,
+            normalize_query(request.user_query),
         )
-        return ""
+        cache_key = make_key(*key)
+        cached = await cache_call(answer_cache.get, cache_key)
+        if cached is not None:
+            reply, usage, shared = cached["reply"], cached["usage"], True
+        else:
+            (reply, usage), shared = await first_question_flights.do(key, generate)
+            # Fallback-model answers are fine for this request but not worth
+            # serving to everyone for the cache TTL.
+            if not shared and usage and usage.get("model") == REPLY_MODEL:
+                await cache_call(answer_cache.set, cache_key, {"reply": reply, "usage": usage})
+        if shared and usage:
+            # No work was done for this message; None keeps it out of the
+            # latency averages instead of repeating the leader's timings.
+            usage = {**usage, "prompt_tokens": 0, "completion_tokens": 0, "retrieval_ms": None, "llm_ms": None}
 
-    clean_text = re.sub(
-        r'\[VERSE title="(.+?)"\]([\s\S]*?)\[\/VERSE\]', extract_verses, reply
-    ).strip()
+    verses_data, _ = extract_verses(reply)
+    if comparative:
+        for verse in verses_data:
+            entry = find_scripture(verse["reference"])
+            if entry:
+                verse["scripture_id"] = entry["namespace"]
 
-    ai_msg = models.ChatMessage(
-        session_id=request.session_id,
-        role="ai",
-        content=reply,
-        verses_json=json.dumps(verses_data) if verses_data else None,
-    )
-    db.add(ai_msg)
-    db.commit()
+    with metrics.timed("json_serialization"):
+        verses_json = json.dumps(verses_data) if verses_data else None
+
+    async with AsyncSessionLocal() as db:
+        ai_msg = models.ChatMessage(
+            session_id=request.session_id,
+            role="ai",
+            content=reply,
+            verses_json=verses_json,
+            **(usage or {}),
+        )
+        db.add(ai_msg)
+        await db.flush()
+        if verses_data:
+            await db.execute(
+                insert(models.VerseCitation),
+                citation_rows(ai_msg.id, session.id, session.user_id, session.scripture_id, verses_data),
+            )
+        await db.commit()
 
     return {"answer": reply}
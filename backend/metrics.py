@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY,
+)
+from sqlalchemy import event
+import os
+import time
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+
+REQUEST_SECONDS = Histogram(
+    "secularai_request_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_SECONDS = Histogram(
+    "secularai_stage_seconds",
+    "Latency of individual pipeline stages.",
+    ["stage", "target"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERIES = Counter("secularai_db_queries_total", "SQL statements executed.")
+DB_POOL_WAIT_SECONDS = Histogram(
+    "secularai_db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_HOLD_SECONDS = Histogram(
+    "secularai_db_pool_hold_seconds",
+    "How long a connection stays checked out of the pool.",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "secularai_db_pool_checked_out", "Connections currently checked out.", ["engine"]
+)
+
+
+def namespace_label(namespace: str) -> str:
+    # Uploaded PDFs get one namespace each, so collapse them into one label.
+    if namespace and namespace.startswith("user_"):
+        return "pdf"
+    return namespace or "default"
+
+
+@contextmanager
+def timed(stage: str, target: str = ""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage, target).observe(time.perf_counter() - start)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        STAGE_SECONDS.labels("db_query", "").observe(time.perf_counter() - start)
+        DB_QUERIES.inc()
+
+
+def instrument_pool(engine, name: str):
+    pool = engine.pool
+    do_get = pool._do_get
+
+    # Pool events only fire once a connection is handed out, so time the
+    # blocking get itself to see waits on an exhausted pool.
+    def timed_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(name).observe(time.perf_counter() - start)
+
+    pool._do_get = timed_get
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        DB_POOL_CHECKED_OUT.labels(name).inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        start = connection_record.info.pop("checked_out_at", None)
+        if start is not None:
+            DB_POOL_HOLD_SECONDS.labels(name).observe(time.perf_counter() - start)
+            DB_POOL_CHECKED_OUT.labels(name).dec()
+
+
+def render_latest():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, Index
 from sqlalchemy.sql import func
 from database import Base
 
@@ -37,6 +37,9 @@ class PasswordReset(Base):
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    __table_args__ = (
+        Index("ix_chat_sessions_user_scripture_created", "user_id", "scripture_id", "created_at"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     user_id = Column(Integer, index=True, nullable=False)
@@ -48,6 +51,9 @@ class ChatSession(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, index=True, nullable=False)
@@ -55,7 +61,13 @@ class ChatMessage(Base):
     content = Column(Text, nullable=False)
     verses_json = Column(Text, nullable=True)
     sentiment = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    retrieval_ms = Column(Float, nullable=True)
+    llm_ms = Column(Float, nullable=True)
+    source = Column(String, nullable=True)  # "import" for rows loaded via /api/chat/import
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
 
 class PDFUpload(Base):
@@ -77,4 +89,64 @@ class UserInsight(Base):
     archetype = Column(String, nullable=False)
     raw_take = Column(Text, nullable=False)
     tags_json = Column(Text, nullable=False)  # JSON array string
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    llm_ms = Column(Float, nullable=True)
     generated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class VerseCitation(Base):
+    __tablename__ = "verse_citations"
+    __table_args__ = (
+        Index("ix_verse_citations_scripture_ref", "scripture_id", "reference_key"),
+        Index("ix_verse_citations_user_ref", "user_id", "reference_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    message_id = Column(Integer, index=True, nullable=False)
+    session_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    scripture_id = Column(String, nullable=False)
+    reference = Column(String, nullable=False)
+    reference_key = Column(String, nullable=False)  # lowercased, whitespace-collapsed
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_session_key", "session_id", "key", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    request_hash = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending | done
+    response_json = Column(Text, nullable=True)
+    locked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class InsightUsage(Base):
+    """One row per insight generation call; UserInsight only keeps the latest result."""
+
+    __tablename__ = "insight_usage"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, index=True, nullable=False)
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    llm_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,83 +1,110 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 import os
 import uuid
 import tempfile
+import shutil
 
-from database import get_db
+from database import get_async_db
 from models import User, PDFUpload, ChatSession
 from chat_router import get_current_user
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_mistralai import MistralAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
+from pdf_stream import PdfStream, MAX_PDF_PAGES, count_pages
+import query
+from llm_client import run_blocking
+from session_index import session_index, SESSION_INDEX_ENABLED, SESSION_INDEX_MAX_CHUNKS
 
 router = APIRouter(prefix="/api/chat", tags=["Dynamic PDF"])
 
 def process_pdf_background(tmp_path: str, namespace: str):
     try:
-        loader = PyPDFLoader(tmp_path)
-        documents = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, chunk_overlap=100, separators=["\n\n", "\n", " ", ""]
-        )
-        texts = text_splitter.split_documents(documents)
-
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-        index = pc.Index("gita")
-        embeddings = MistralAIEmbeddings(model="mistral-embed")
-        vector_store = PineconeVectorStore(index=index, embedding=embeddings)
-
-        batch_size = 100
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i : i + batch_size]
-            batch_uuids = [str(uuid.uuid4()) for _ in range(len(batch))]
-            vector_store.add_documents(documents=batch, ids=batch_uuids, namespace=namespace)
+        stream = PdfStream(tmp_path, batch_size=100, max_pages=MAX_PDF_PAGES)
+        use_local = SESSION_INDEX_ENABLED
+        local_texts, local_metadatas, local_vectors = [], [], []
+
+        for batch in stream:
+            texts = [c.page_content for c in batch]
+            metadatas = [c.metadata for c in batch]
+            vectors = query.embeddings.embed_documents(texts)
+
+            if use_local and len(local_texts) + len(texts) <= SESSION_INDEX_MAX_CHUNKS:
+                local_texts.extend(texts)
+                local_metadatas.extend(metadatas)
+                local_vectors.extend(vectors)
+                continue
+            if use_local:
+                # Too big for the local index after all; move what we have to Pinecone.
+                query.upsert_embeddings(namespace, local_texts, local_metadatas, local_vectors)
+                local_texts, local_metadatas, local_vectors = [], [], []
+                use_local = False
+            query.upsert_embeddings(namespace, texts, metadatas, vectors)
+
+        if use_local and local_texts:
+            session_index.put(namespace, local_texts, local_metadatas, local_vectors)
+        print(f"[PDF] {namespace}: {stream.report()}")
     except Exception as e:
         print(f"Background PDF processing failed for namespace {namespace}: {e}")
     finally:
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+def save_upload(file: UploadFile) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        return tmp.name
+
+
 @router.post("/upload-pdf")
 async def upload_pdf(
     background_tasks: BackgroundTasks,
     session_id: str = Form(...),
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
     six_hours_ago = datetime.utcnow() - timedelta(hours=6)
-    recent_uploads = db.query(PDFUpload).filter(
-        PDFUpload.user_id == current_user.id,
-        PDFUpload.created_at >= six_hours_ago
-    ).count()
+    recent_uploads = await db.scalar(
+        select(func.count(PDFUpload.id)).where(
+            PDFUpload.user_id == current_user.id,
+            PDFUpload.created_at >= six_hours_ago
+        )
+    )
 
     if recent_uploads >= 5:
         raise HTTPException(status_code=429, detail="Limit reached: You can only upload 5 PDFs every 6 hours.")
 
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session or session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Invalid session")
 
-    existing_pdf = db.query(PDFUpload).filter(
-        PDFUpload.session_id == session_id,
-        PDFUpload.filename == file.filename
+    existing_pdf = (
+        await db.execute(
+            select(PDFUpload.id).where(
+                PDFUpload.session_id == session_id,
+                PDFUpload.filename == file.filename
+            )
+        )
     ).first()
     if existing_pdf:
         raise HTTPException(status_code=400, detail="This exact PDF is already active in the current session.")
 
     namespace = f"user_{current_user.id}_{uuid.uuid4().hex[:8]}"
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    tmp_path = await run_in_threadpool(save_upload, file)
+
+    try:
+        pages = await run_in_threadpool(count_pages, tmp_path)
+    except Exception:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=400, detail="Could not read this PDF")
+    if pages > MAX_PDF_PAGES:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=400, detail=f"PDFs can have at most {MAX_PDF_PAGES} pages.")
 
     new_pdf = PDFUpload(
         user_id=current_user.id,
@@ -86,42 +113,42 @@ async def upload_pdf(
         namespace=namespace
     )
     db.add(new_pdf)
-    db.commit()
+    await db.commit()
 
     background_tasks.add_task(process_pdf_background, tmp_path, namespace)
     return {"message": "PDF uploaded successfully and is processing in the background", "filename": file.filename}
 
 
 @router.get("/sessions/{session_id}/pdfs")
-def get_session_pdfs(
+async def get_session_pdfs(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+    session = await db.get(ChatSession, session_id)
     if not session or session.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Invalid session")
 
-    pdfs = db.query(PDFUpload).filter(PDFUpload.session_id == session_id).all()
+    pdfs = (
+        await db.execute(select(PDFUpload).where(PDFUpload.session_id == session_id))
+    ).scalars().all()
     return [{"id": p.id, "filename": p.filename} for p in pdfs]
 
 @router.delete("/pdfs/{pdf_id}")
-def delete_pdf(
+async def delete_pdf(
     pdf_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    pdf = db.query(PDFUpload).filter(PDFUpload.id == pdf_id).first()
+    pdf = await db.get(PDFUpload, pdf_id)
     if not pdf or pdf.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     try:
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-        index = pc.Index("gita")
-        index.delete(delete_all=True, namespace=pdf.namespace)
+        await run_blocking(query.delete_namespace, pdf.namespace)
     except Exception as e:
         print(f"Failed to delete pinecone namespace: {e}")
 
-    db.delete(pdf)
-    db.commit()
+    await db.delete(pdf)
+    await db.commit()
     return {"message": "PDF deleted"}
@@ -0,0 +1,86 @@
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+import os
+
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "500"))
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+
+
+class PageLimitExceeded(Exception):
+    pass
+
+
+def make_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, separators=["\n\n", "\n", " ", ""]
+    )
+
+
+def count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def current_rss_mb():
+    # ru_maxrss is the peak over the whole process lifetime, so it cannot show
+    # what one file cost; sample the current RSS instead (Linux only).
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class PdfStream:
+    """Lazily yields batches of chunks from a PDF, one page at a time.
+
+    Splitting page by page gives the same chunks as split_documents(load())
+    because the splitter never joins text across documents.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, max_pages: int = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_pages = max_pages
+        self.splitter = make_splitter()
+        self.pages = 0
+        self.chunks = 0
+        self.start_rss_mb = current_rss_mb()
+        self.peak_rss_mb = self.start_rss_mb
+
+    def _pages(self):
+        for page in PyPDFLoader(self.path).lazy_load():
+            self.pages += 1
+            if self.max_pages and self.pages > self.max_pages:
+                raise PageLimitExceeded(f"PDF has more than {self.max_pages} pages")
+            yield page
+
+    def _sample_rss(self):
+        rss = current_rss_mb()
+        if rss is not None and self.peak_rss_mb is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+    def __iter__(self):
+        batch = []
+        for page in self._pages():
+            for chunk in self.splitter.split_documents([page]):
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    self.chunks += len(batch)
+                    self._sample_rss()
+                    yield batch
+                    batch = []
+        if batch:
+            self.chunks += len(batch)
+            self._sample_rss()
+            yield batch
+
+    def report(self) -> str:
+        summary = f"{self.pages} pages, {self.chunks} chunks"
+        if self.start_rss_mb is None:
+            return summary
+        # Process-wide RSS, so concurrent uploads show up here too.
+        growth = self.peak_rss_mb - self.start_rss_mb
+        return f"{summary}, process RSS +{growth:.0f} MB during this file (sampled per batch, {self.start_rss_mb:.0f} MB at start)"
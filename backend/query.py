@@ -1,10 +1,18 @@
 from langchain_mistralai import MistralAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
-from langchain_community.chat_message_histories import ChatMessageHistory
 from dotenv import load_dotenv
-from groq import Groq
 import os
+import time
+import uuid
+from metrics import timed, namespace_label
+from llm_client import LLMClient
+from embedding_batcher import BatchedEmbeddings
+from safety import safety_filter
+from cache import get_cache, make_key
+from scriptures import resolve, resolve_namespace
+from concurrent.futures import ThreadPoolExecutor
+from session_index import session_index, PDF_NAMESPACE_PREFIX
 
 load_dotenv()
 
@@ -18,29 +26,144 @@ vector_store = None
 try:
     pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
     index = pc.Index("gita")
-    embeddings = MistralAIEmbeddings(model="mistral-embed")
+    embeddings = BatchedEmbeddings(MistralAIEmbeddings(model="mistral-embed"))
     vector_store = PineconeVectorStore(index=index, embedding=embeddings)
     print("[OK] Pinecone + Mistral embeddings connected.")
 except Exception as e:
     print(f"[WARNING] Pinecone init failed: {e}")
     embeddings = None
 
-chat = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-chat_history = ChatMessageHistory()
+chat = LLMClient()
+embedding_cache = get_cache(
+    "query_embeddings", max_size=int(os.getenv("EMBED_CACHE_SIZE", "10000")), ttl_s=86400
+)
 
 
-def is_harmful_query(q: str):
-    bad = [
-        "kill", "murder", "hurt someone", "attack", "self harm",
-        "suicide", "end my life", "rape", "abuse", "violent",
-        "bomb", "terror"
-    ]
-    q = q.lower()
-    return any(b in q for b in bad)
+HARMFUL_REPLY = "I cannot guide you toward harm. But I can help you calm your mind. Tell me what you are feeling."
+REPLY_MODEL = "llama-3.3-70b-versatile"
+RETRIEVAL_STRATEGY = os.getenv("RETRIEVAL_STRATEGY", "similarity")
+COMPARE_TOKENS_PER_SCRIPTURE = int(os.getenv("COMPARE_TOKENS_PER_SCRIPTURE", "600"))
+COMPARE_MAX_SCRIPTURES = 4
+
+retrieval_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_WORKERS", "16")), thread_name_prefix="retrieval"
+)
+
+
+def delete_namespace(namespace: str):
+    if session_index.delete(namespace):
+        return
+    vector_store.delete(delete_all=True, namespace=namespace)
+
+
+def upsert_embeddings(namespace: str, texts, metadatas, vectors):
+    # Vectors are already computed, so write them directly instead of re-embedding.
+    if index is None:
+        return vector_store.add_texts(texts, metadatas=metadatas, namespace=namespace)
+    index.upsert(
+        vectors=[
+            {"id": str(uuid.uuid4()), "values": v, "metadata": {**m, "text": t}}
+            for t, m, v in zip(texts, metadatas, vectors)
+        ],
+        namespace=namespace,
+    )
+
+
+def list_namespaces() -> set[str]:
+    if index is None:
+        return set()
+    return set(index.describe_index_stats().namespaces.keys())
+
+
+def embed_query(query: str):
+    key = make_key("mistral-embed", query)
+    vector = embedding_cache.get(key)
+    if vector is not None:
+        return vector
+    with timed("embedding"):
+        vector = embeddings.embed_query(query)
+    embedding_cache.set(key, vector)
+    return vector
+
+
+def similarity_search(
+    query: str,
+    namespace: str = None,
+    k: int = 3,
+    embedding=None,
+    strategy: str = None,
+    fetch_k: int = 20,
+):
+    strategy = strategy or RETRIEVAL_STRATEGY
+    if embedding is None:
+        embedding = embed_query(query)
+    if namespace and namespace.startswith(PDF_NAMESPACE_PREFIX):
+        local = session_index.get(namespace)
+        if local is not None:
+            with timed("vector_search", "pdf_local"):
+                return [doc for doc, _ in local.search(embedding, k)]
+    with timed("vector_search", namespace_label(namespace)):
+        if strategy == "mmr":
+            return vector_store.max_marginal_relevance_search_by_vector(
+                embedding, k=k, fetch_k=fetch_k, namespace=namespace
+            )
+        results = vector_store.similarity_search_by_vector_with_score(
+            embedding, k=k, namespace=namespace
+        )
+    return [doc for doc, _ in results]
+
+
+def search_pdfs(query: str, pdf_namespaces, query_embedding):
+    docs = []
+    futures = {
+        ns: retrieval_pool.submit(similarity_search, query, ns, 2, query_embedding)
+        for ns in pdf_namespaces or []
+    }
+    for ns, future in futures.items():
+        try:
+            docs.extend(future.result())
+        except Exception as e:
+            print(f"Error querying PDF namespace {ns}: {e}")
+    return docs
 
 
-def similarity_search(query: str, namespace: str = None, k: int = 3):
-    return vector_store.similarity_search(query, k=k, namespace=namespace)
+def truncate_to_budget(docs, token_budget: int) -> str:
+    # Rough 4 characters per token, which is close enough for English prose.
+    char_budget = token_budget * 4
+    parts, used = [], 0
+    for d in docs:
+        remaining = char_budget - used
+        if remaining <= 0:
+            break
+        parts.append(d.page_content[:remaining])
+        used += len(parts[-1])
+    return "\n\n".join(parts)
+
+
+def complete(system_prompt: str, user_prompt: str, retrieval_ms: float):
+    llm_start = time.perf_counter()
+    response = chat.complete(
+        model=REPLY_MODEL,
+        temperature=0.6,
+        top_p=0.95,
+        max_tokens=1024,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+    )
+
+    llm_ms = (time.perf_counter() - llm_start) * 1000
+
+    reply = response.choices[0].message.content
+    usage = {
+        "model": response.model or REPLY_MODEL,
+        "prompt_tokens": response.usage.prompt_tokens if response.usage else None,
+        "completion_tokens": response.usage.completion_tokens if response.usage else None,
+        "retrieval_ms": retrieval_ms,
+        "llm_ms": llm_ms,
+    }
+    return reply, usage
 
 
 def get_ai_reply(
@@ -50,33 +173,18 @@ def get_ai_reply(
     scripture: str = "Bhagavad Gita",
     pdf_namespaces: list[str] = None
 ):
-    if is_harmful_query(query):
-        return "I cannot guide you toward harm. But I can help you calm your mind. Tell me what you are feeling."
-
-    s_cleaned = scripture.lower()
-    namespace = "gita"
-    if "bible" in s_cleaned:
-        namespace = "bible"
-    elif "quran" in s_cleaned:
-        namespace = "quran"
-    elif "torah" in s_cleaned:
-        namespace = "torah"
-    elif "dhammapada" in s_cleaned:
-        namespace = "dhammapada"
-    elif "sahib" in s_cleaned or "granth" in s_cleaned:
-        namespace = "gurugrantsahib"
-
-    context_docs = similarity_search(query, namespace=namespace, k=3)
-
-    if pdf_namespaces:
-        for ns in pdf_namespaces:
-            try:
-                pdf_docs = similarity_search(query, namespace=ns, k=2)
-                context_docs.extend(pdf_docs)
-            except Exception as e:
-                print(f"Error querying PDF namespace {ns}: {e}")
+    if safety_filter.is_harmful(query):
+        return HARMFUL_REPLY, None
+
+    namespace = resolve_namespace(scripture)
+
+    retrieval_start = time.perf_counter()
+    query_embedding = embed_query(query)
+    context_docs = similarity_search(query, namespace=namespace, k=3, embedding=query_embedding)
+    context_docs.extend(search_pdfs(query, pdf_namespaces, query_embedding))
 
     context = "\n\n".join([d.page_content for d in context_docs])
+    retrieval_ms = (time.perf_counter() - retrieval_start) * 1000
 
     system_prompt = f"""
 You are a wise and compassionate guide representing the teachings of {scripture} from the {religion} tradition, speaking in simple modern English.
@@ -110,16 +218,71 @@ User: {query}
 Respond now following all rules.
 """
 
-    response = chat.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        temperature=0.6,
-        top_p=0.95,
-        max_tokens=1024,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-    )
+    return complete(system_prompt, user_prompt, retrieval_ms)
 
-    reply = response.choices[0].message.content
-    return reply
+
+def get_comparative_reply(
+    query: str,
+    history_text: str = "",
+    scriptures: list[str] = None,
+    pdf_namespaces: list[str] = None
+):
+    if safety_filter.is_harmful(query):
+        return HARMFUL_REPLY, None
+
+    entries = []
+    for scripture in scriptures[:COMPARE_MAX_SCRIPTURES]:
+        entry = resolve(scripture)
+        if entry not in entries:
+            entries.append(entry)
+
+    retrieval_start = time.perf_counter()
+    query_embedding = embed_query(query)
+    futures = [
+        retrieval_pool.submit(similarity_search, query, e["namespace"], 3, query_embedding)
+        for e in entries
+    ]
+    pdf_docs = search_pdfs(query, pdf_namespaces, query_embedding)
+
+    sections = []
+    for entry, future in zip(entries, futures):
+        context = truncate_to_budget(future.result(), COMPARE_TOKENS_PER_SCRIPTURE)
+        sections.append(f"### {entry['name']} ({entry['religion']})\n{context}")
+    if pdf_docs:
+        sections.append("### User's documents\n" + "\n\n".join(d.page_content for d in pdf_docs))
+    context = "\n\n".join(sections)
+    retrieval_ms = (time.perf_counter() - retrieval_start) * 1000
+
+    names = ", ".join(e["name"] for e in entries)
+    system_prompt = f"""
+You are a wise and compassionate guide who knows the teachings of these scriptures: {names}. Speak in simple modern English.
+
+Rules:
+1. Match the user’s tone.
+2. Compare what each scripture says about the user's question. Give each tradition its own short part, then say briefly where they agree and where they differ.
+3. The Context is grouped by scripture. Use each group only for that scripture. If the user uploaded PDFs, their text is under "User's documents".
+4. If using a verse or quote, write it in this exact format, and always start the title with the scripture's name:
+     [VERSE title="<Scripture name> <Reference>"]
+     <actual verse text here>
+     [/VERSE]
+   - Example: [VERSE title="Bhagavad Gita Chapter 2, Verse 47"] You have a right to perform your prescribed duty... [/VERSE]
+5. Do NOT invent verses. Only use verses you know from these scriptures.
+6. Be fair to every tradition. Do not rank them.
+7. English should be very simple and easy to understand.
+8. Respond in the user's language.
+9. Avoid medical/legal/harmful advice.
+"""
+
+    user_prompt = f"""
+Context:
+{context}
+
+Conversation:
+{history_text}
+
+User: {query}
+
+Respond now following all rules.
+"""
+
+    return complete(system_prompt, user_prompt, retrieval_ms)
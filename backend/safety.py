@@ -0,0 +1,106 @@
+from prometheus_client import Counter
+import json
+import os
+import re
+
+from metrics import timed
+
+SAFETY_TERMS_PATH = os.getenv(
+    "SAFETY_TERMS_PATH", os.path.join(os.path.dirname(__file__), "safety_terms.json")
+)
+SAFETY_LANGUAGES = [
+    lang.strip() for lang in os.getenv("SAFETY_LANGUAGES", "").split(",") if lang.strip()
+]
+SAFETY_CLASSIFIER_PATH = os.getenv("SAFETY_CLASSIFIER_PATH")
+SAFETY_CLASSIFIER_THRESHOLD = float(os.getenv("SAFETY_CLASSIFIER_THRESHOLD", "0.8"))
+
+BLOCKED = Counter("secularai_safety_blocked_total", "Queries blocked by the pre-filter.", ["stage"])
+
+
+# re's \w excludes combining marks, so Devanagari vowel signs (e.g. the ु in
+# बमुश्किल) would end a "word"; count marks and Indic blocks as word characters.
+WORD_CHAR = r"[\w\u0300-\u036f\u0900-\u0dff]"
+
+
+def term_pattern(term: str) -> str:
+    # Words in a phrase may be separated by any whitespace; a trailing * allows a suffix.
+    wildcard = term.endswith("*")
+    words = term.rstrip("*").split()
+    pattern = r"\s+".join(re.escape(w) for w in words)
+    return pattern + (WORD_CHAR + "*" if wildcard else "")
+
+
+def compile_terms(terms) -> re.Pattern:
+    alternatives = sorted({term_pattern(t) for t in terms}, key=len, reverse=True)
+    return re.compile(
+        rf"(?<!{WORD_CHAR})(?:" + "|".join(alternatives) + rf")(?!{WORD_CHAR})", re.IGNORECASE
+    )
+
+
+class TermMatcher:
+    name = "terms"
+
+    def __init__(self, terms_by_language: dict, languages=None):
+        selected = [
+            term
+            for lang, terms in terms_by_language.items()
+            if not languages or lang in languages
+            for term in terms
+        ]
+        self.pattern = compile_terms(selected)
+
+    @classmethod
+    def from_file(cls, path: str, languages=None):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), languages)
+
+    def __call__(self, text: str) -> bool:
+        return self.pattern.search(text) is not None
+
+
+class LocalClassifier:
+    """Any pickled estimator exposing predict_proba over raw text (e.g. a sklearn Pipeline)."""
+
+    name = "classifier"
+
+    def __init__(self, model, threshold: float):
+        self.model = model
+        self.threshold = threshold
+
+    @classmethod
+    def from_file(cls, path: str, threshold: float):
+        import joblib
+
+        return cls(joblib.load(path), threshold)
+
+    def __call__(self, text: str) -> bool:
+        return self.model.predict_proba([text])[0][-1] >= self.threshold
+
+
+class SafetyFilter:
+    def __init__(self, stages):
+        self.stages = stages
+
+    def check(self, text: str):
+        for stage in self.stages:
+            if stage(text):
+                BLOCKED.labels(stage.name).inc()
+                return stage.name
+        return None
+
+    def is_harmful(self, text: str) -> bool:
+        with timed("safety"):
+            return self.check(text) is not None
+
+
+def build_default_filter() -> SafetyFilter:
+    stages = [TermMatcher.from_file(SAFETY_TERMS_PATH, SAFETY_LANGUAGES)]
+    if SAFETY_CLASSIFIER_PATH:
+        try:
+            stages.append(LocalClassifier.from_file(SAFETY_CLASSIFIER_PATH, SAFETY_CLASSIFIER_THRESHOLD))
+        except Exception as e:
+            print(f"[WARNING] Safety classifier not loaded: {e}")
+    return SafetyFilter(stages)
+
+
+safety_filter = build_default_filter()
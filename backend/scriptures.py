@@ -0,0 +1,35 @@
+# Matched in order against the lowercased scripture string; the first entry
+# with a matching alias wins and DEFAULT_NAMESPACE is used when none match.
+SCRIPTURES = [
+    {"namespace": "bible", "name": "Bible", "religion": "christianity", "aliases": ["bible"]},
+    {"namespace": "quran", "name": "Quran", "religion": "islam", "aliases": ["quran"]},
+    {"namespace": "torah", "name": "Torah", "religion": "judaism", "aliases": ["torah"]},
+    {"namespace": "dhammapada", "name": "Dhammapada", "religion": "buddhism", "aliases": ["dhammapada"]},
+    {
+        "namespace": "gurugrantsahib",
+        "name": "Guru Granth Sahib",
+        "religion": "sikhism",
+        "aliases": ["sahib", "granth"],
+    },
+    {"namespace": "gita", "name": "Bhagavad Gita", "religion": "hinduism", "aliases": ["gita", "bhagavad"]},
+]
+
+DEFAULT_NAMESPACE = "gita"
+
+BY_NAMESPACE = {s["namespace"]: s for s in SCRIPTURES}
+
+
+def find(text: str):
+    s_cleaned = text.lower()
+    for entry in SCRIPTURES:
+        if any(alias in s_cleaned for alias in entry["aliases"]):
+            return entry
+    return None
+
+
+def resolve(scripture: str) -> dict:
+    return find(scripture) or BY_NAMESPACE[DEFAULT_NAMESPACE]
+
+
+def resolve_namespace(scripture: str) -> str:
+    return resolve(scripture)["namespace"]
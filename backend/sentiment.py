@@ -0,0 +1,167 @@
+from prometheus_client import Counter, Gauge
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from database import SessionLocal
+from models import ChatMessage
+
+SENTIMENT_LEXICON_PATH = os.getenv(
+    "SENTIMENT_LEXICON_PATH", os.path.join(os.path.dirname(__file__), "sentiment_lexicon.json")
+)
+# Optional pickled estimator with predict() over raw text, replacing the lexicon.
+SENTIMENT_CLASSIFIER_PATH = os.getenv("SENTIMENT_CLASSIFIER_PATH")
+SENTIMENT_ENABLED = os.getenv("SENTIMENT_ENABLED", "true").lower() == "true"
+SENTIMENT_INTERVAL_S = float(os.getenv("SENTIMENT_INTERVAL_S", "60"))
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "1000"))
+# Caps one incremental pass so a large backlog does not hog the worker thread.
+SENTIMENT_MAX_BATCHES = int(os.getenv("SENTIMENT_MAX_BATCHES", "20"))
+
+LABELS = ["anxious", "negative", "positive"]  # ties resolve left to right
+NEUTRAL = "neutral"
+
+TAGGED = Counter("secularai_sentiment_tagged_total", "User messages tagged with a sentiment.", ["label"])
+RATE = Gauge("secularai_sentiment_messages_per_second", "Throughput of the last tagging pass.")
+
+TOKEN_RE = re.compile(r"[\w']+")
+
+
+class LexiconClassifier:
+    """Scores a batch at once: token ids are looked up in a (vocab x label) weight matrix.
+
+    A negator directly before a word swaps its positive and negative weight.
+    """
+
+    def __init__(self, lexicon: dict):
+        words = sorted({w for label in LABELS for w in lexicon.get(label, [])} | set(lexicon.get("negators", [])))
+        self.vocab = {w: i + 1 for i, w in enumerate(words)}  # 0 is out-of-vocabulary
+        self.weights = np.zeros((len(words) + 1, len(LABELS)), dtype=np.float32)
+        for col, label in enumerate(LABELS):
+            for w in lexicon.get(label, []):
+                self.weights[self.vocab[w], col] = 1.0
+        swap = list(range(len(LABELS)))
+        swap[LABELS.index("positive")], swap[LABELS.index("negative")] = (
+            LABELS.index("negative"),
+            LABELS.index("positive"),
+        )
+        self.negated_weights = self.weights[:, swap]
+        self.is_negator = np.zeros(len(words) + 1, dtype=bool)
+        for w in lexicon.get("negators", []):
+            self.is_negator[self.vocab[w]] = True
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def predict(self, texts):
+        ids, owners = [], []
+        for n, text in enumerate(texts):
+            tokens = [self.vocab.get(t, 0) for t in TOKEN_RE.findall(text.lower())]
+            ids.extend(tokens)
+            owners.extend([n] * len(tokens))
+        scores = np.zeros((len(texts), len(LABELS)), dtype=np.float32)
+        if ids:
+            ids = np.asarray(ids)
+            owners = np.asarray(owners)
+            negated = np.zeros(len(ids), dtype=bool)
+            negated[1:] = self.is_negator[ids[:-1]] & (owners[1:] == owners[:-1])
+            contributions = np.where(negated[:, None], self.negated_weights[ids], self.weights[ids])
+            np.add.at(scores, owners, contributions)
+        best = scores.argmax(axis=1)
+        return [LABELS[b] if scores[n, b] > 0 else NEUTRAL for n, b in enumerate(best)]
+
+
+def load_classifier():
+    if SENTIMENT_CLASSIFIER_PATH:
+        try:
+            import joblib
+
+            return joblib.load(SENTIMENT_CLASSIFIER_PATH)
+        except Exception as e:
+            print(f"[WARNING] Sentiment classifier not loaded, using lexicon: {e}")
+    return LexiconClassifier.from_file(SENTIMENT_LEXICON_PATH)
+
+
+classifier = load_classifier()
+
+
+def classify(texts) -> list:
+    return [str(label) for label in classifier.predict(list(texts))] if texts else []
+
+
+def tag_pending(batch_size: int = SENTIMENT_BATCH_SIZE, max_batches: int = None, verbose: bool = False) -> int:
+    """Tag untagged user messages in keyset-paginated batches.
+
+    Only rows with sentiment IS NULL are read, so a stopped pass resumes
+    where it left off and new messages are picked up by the next pass.
+    """
+    last_id = 0
+    total = batches = 0
+    start = time.perf_counter()
+    while max_batches is None or batches < max_batches:
+        with SessionLocal() as db:
+            rows = (
+                db.query(ChatMessage.id, ChatMessage.content)
+                .filter(
+                    ChatMessage.id > last_id,
+                    ChatMessage.role == "user",
+                    ChatMessage.sentiment.is_(None),
+                )
+                .order_by(ChatMessage.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            labels = classify([content for _, content in rows])
+            db.bulk_update_mappings(
+                ChatMessage,
+                [{"id": message_id, "sentiment": label} for (message_id, _), label in zip(rows, labels)],
+            )
+            db.commit()
+
+        for label in labels:
+            TAGGED.labels(label).inc()
+        last_id = rows[-1].id
+        total += len(rows)
+        batches += 1
+        if verbose:
+            elapsed = time.perf_counter() - start
+            print(f"tagged up to message {last_id}: {total} messages, {total / elapsed:.0f} msg/s")
+
+    elapsed = time.perf_counter() - start
+    if total:
+        RATE.set(total / elapsed)
+    if verbose:
+        print(f"done: {total} messages in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} msg/s)")
+    return total
+
+
+async def run_forever():
+    # Imported here so the backfill CLI does not pull in the vector store client.
+    from janitor import acquire_lease
+
+    while True:
+        try:
+            # One worker tags at a time; the others would race on the same rows.
+            if await asyncio.to_thread(acquire_lease, "sentiment", SENTIMENT_INTERVAL_S * 2):
+                await asyncio.to_thread(tag_pending, max_batches=SENTIMENT_MAX_BATCHES)
+        except Exception as e:
+            print(f"[sentiment] tagging pass failed: {e}")
+        await asyncio.sleep(SENTIMENT_INTERVAL_S)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("usage: python sentiment.py backfill [batch_size]")
+        sys.exit(1)
+    from database import sync_schema
+
+    sync_schema()
+    tag_pending(int(sys.argv[2]) if len(sys.argv) > 2 else SENTIMENT_BATCH_SIZE, verbose=True)
@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from langchain_core.documents import Document
+from prometheus_client import Counter, Gauge
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+PDF_NAMESPACE_PREFIX = "user_"
+
+# Opt-in: the index lives in the worker that processed the upload (plus
+# SESSION_INDEX_DIR), so only enable it when every /query for a session is
+# served by a worker that can see it, e.g. one instance or a shared directory.
+SESSION_INDEX_ENABLED = os.getenv("SESSION_INDEX_ENABLED", "false").lower() == "true"
+# PDFs with more chunks than this still go to Pinecone.
+SESSION_INDEX_MAX_CHUNKS = int(os.getenv("SESSION_INDEX_MAX_CHUNKS", "2000"))
+SESSION_INDEX_MEMORY_MB = float(os.getenv("SESSION_INDEX_MEMORY_MB", "256"))
+SESSION_INDEX_DTYPE = os.getenv("SESSION_INDEX_DTYPE", "int8")
+SESSION_INDEX_DIR = os.getenv(
+    "SESSION_INDEX_DIR", os.path.join(tempfile.gettempdir(), "secularai_session_index")
+)
+
+INDEX_BYTES = Gauge("secularai_session_index_bytes", "Bytes held by in-memory session indexes.")
+INDEX_COUNT = Gauge("secularai_session_index_namespaces", "Session indexes held in memory.")
+INDEX_LOOKUPS = Counter(
+    "secularai_session_index_lookups_total", "Session index lookups by result.", ["result"]
+)
+
+
+class LocalIndex:
+    """Quantized, normalized chunk vectors for one uploaded PDF."""
+
+    def __init__(self, texts, metadatas, vectors, scales=None):
+        self.texts = texts
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.scales = scales
+
+    @classmethod
+    def build(cls, texts, metadatas, vectors, dtype: str = SESSION_INDEX_DTYPE):
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        if dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127
+            scales[scales == 0] = 1
+            quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+            return cls(texts, metadatas, quantized, scales.astype(np.float32))
+        return cls(texts, metadatas, matrix.astype(np.float16))
+
+    @property
+    def nbytes(self) -> int:
+        text_bytes = sum(len(t) for t in self.texts)
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0) + text_bytes
+
+    def search(self, embedding, k: int):
+        query = np.asarray(embedding, dtype=np.float32)
+        scores = self.vectors.astype(np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(page_content=self.texts[i], metadata=self.metadatas[i]), float(scores[i]))
+            for i in top
+        ]
+
+    def save(self, base: str):
+        arrays = {"vectors": self.vectors}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        np.savez(base + ".npz", **arrays)
+        with open(base + ".json", "w") as f:
+            json.dump({"texts": self.texts, "metadatas": self.metadatas}, f)
+
+    @classmethod
+    def load(cls, base: str):
+        arrays = np.load(base + ".npz")
+        with open(base + ".json") as f:
+            meta = json.load(f)
+        scales = arrays["scales"] if "scales" in arrays.files else None
+        return cls(meta["texts"], meta["metadatas"], arrays["vectors"], scales)
+
+
+class SessionIndexStore:
+    """LRU of LocalIndex objects bounded by total bytes, written through to disk."""
+
+    def __init__(self, memory_budget_bytes: int, spill_dir: str = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+        self._indexes = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def _path(self, namespace: str):
+        return os.path.join(self.spill_dir, namespace) if self.spill_dir else None
+
+    def _insert(self, namespace: str, index: LocalIndex):
+        with self._lock:
+            old = self._indexes.pop(namespace, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._indexes[namespace] = index
+            self._bytes += index.nbytes
+            while self._bytes > self.memory_budget_bytes and len(self._indexes) > 1:
+                _, evicted = self._indexes.popitem(last=False)
+                self._bytes -= evicted.nbytes
+            INDEX_BYTES.set(self._bytes)
+            INDEX_COUNT.set(len(self._indexes))
+
+    def put(self, namespace: str, texts, metadatas, vectors):
+        index = LocalIndex.build(texts, metadatas, vectors)
+        if self.spill_dir:
+            index.save(self._path(namespace))
+        self._insert(namespace, index)
+
+    def get(self, namespace: str):
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is not None:
+                self._indexes.move_to_end(namespace)
+        if index is not None:
+            INDEX_LOOKUPS.labels("memory").inc()
+            return index
+
+        path = self._path(namespace)
+        if path and os.path.exists(path + ".npz"):
+            index = LocalIndex.load(path)
+            self._insert(namespace, index)
+            INDEX_LOOKUPS.labels("disk").inc()
+            return index
+        INDEX_LOOKUPS.labels("miss").inc()
+        return None
+
+    def delete(self, namespace: str) -> bool:
+        found = False
+        with self._lock:
+            index = self._indexes.pop(namespace, None)
+            if index is not None:
+                self._bytes -= index.nbytes
+                found = True
+            INDEX_BYTES.set(self._bytes)
+            INDEX_COUNT.set(len(self._indexes))
+        path = self._path(namespace)
+        if path:
+            for suffix in (".npz", ".json"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+                    found = True
+        return found
+
+    def list_namespaces(self) -> set[str]:
+        if not self.spill_dir:
+            with self._lock:
+                return set(self._indexes)
+        return {
+            name[: -len(".npz")]
+            for name in os.listdir(self.spill_dir)
+            if name.endswith(".npz")
+        }
+
+
+session_index = SessionIndexStore(
+    int(SESSION_INDEX_MEMORY_MB * 1024 * 1024), SESSION_INDEX_DIR or None
+)
@@ -0,0 +1,43 @@
+from prometheus_client import Counter
+import asyncio
+
+COALESCED = Counter(
+    "secularai_singleflight_coalesced_total",
+    "Callers that shared another request's in-flight result.",
+    ["group"],
+)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key await it."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+
+    async def do(self, key, fn):
+        future = self._calls.get(key)
+        if future is not None:
+            COALESCED.labels(self.name).inc()
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an error with no followers is not logged as unhandled.
+            future.exception()
+            raise
+        finally:
+            self._calls.pop(key, None)
@@ -0,0 +1,202 @@
+from bisect import bisect_left, insort
+from prometheus_client import Gauge
+import asyncio
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func
+
+from database import SessionLocal
+from models import ChatMessage, ChatSession
+from safety import safety_filter
+from scriptures import resolve_namespace
+from singleflight import normalize_query
+
+SUGGEST_ENABLED = os.getenv("SUGGEST_ENABLED", "true").lower() == "true"
+# A question is only suggested once this many different users have asked it.
+SUGGEST_MIN_USERS = int(os.getenv("SUGGEST_MIN_USERS", "3"))
+SUGGEST_MAX_QUESTIONS = int(os.getenv("SUGGEST_MAX_QUESTIONS", "50000"))
+SUGGEST_MAX_CHARS = int(os.getenv("SUGGEST_MAX_CHARS", "160"))
+SUGGEST_MAX_LIMIT = 10
+SUGGEST_REFRESH_S = float(os.getenv("SUGGEST_REFRESH_S", "30"))
+SUGGEST_SNAPSHOT_S = float(os.getenv("SUGGEST_SNAPSHOT_S", "600"))
+SUGGEST_SNAPSHOT_PATH = os.getenv(
+    "SUGGEST_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "secularai_suggest.json")
+)
+SUGGEST_BATCH_SIZE = 2000
+SNAPSHOT_VERSION = 2
+
+INDEXED = Gauge("secularai_suggest_questions", "Distinct normalized questions indexed.", ["scripture"])
+
+
+class PrefixIndex:
+    """Sorted normalized questions for one scripture; a prefix is a contiguous slice."""
+
+    def __init__(self):
+        self.keys = []
+        self.counts = {}
+        # Distinct askers, kept only up to SUGGEST_MIN_USERS ids per question.
+        self.users = {}
+        self._top = {}
+
+    def add(self, key: str, user_ids, count: int = 1):
+        if key in self.counts:
+            self.counts[key] += count
+        else:
+            insort(self.keys, key)
+            self.counts[key] = count
+            self.users[key] = set()
+        askers = self.users[key]
+        for user_id in user_ids:
+            if len(askers) >= SUGGEST_MIN_USERS:
+                break
+            askers.add(user_id)
+        # Only cached answers for prefixes of this key can change.
+        for end in range(len(key) + 1):
+            self._top.pop(key[:end], None)
+
+    def top(self, prefix: str, limit: int, min_users: int):
+        best = self._top.get(prefix)
+        if best is None:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + "\uffff", lo)
+            candidates = (k for k in self.keys[lo:hi] if len(self.users[k]) >= min_users)
+            best = heapq.nsmallest(SUGGEST_MAX_LIMIT, candidates, key=lambda k: (-self.counts[k], len(k), k))
+            self._top[prefix] = best
+        # Shown in normalized form rather than any one user's exact wording.
+        return [k[:1].upper() + k[1:] for k in best[:limit]]
+
+    def prune(self, max_questions: int):
+        if len(self.keys) <= max_questions:
+            return
+        # Evict the least useful questions: fewest distinct askers, then fewest asks.
+        keep = set(heapq.nlargest(max_questions, self.keys, key=lambda k: (len(self.users[k]), self.counts[k])))
+        self.keys = [k for k in self.keys if k in keep]
+        self.counts = {k: c for k, c in self.counts.items() if k in keep}
+        self.users = {k: u for k, u in self.users.items() if k in keep}
+        self._top.clear()
+
+
+class SuggestionIndex:
+    """Frequency-ranked past questions per scripture.
+
+    Every worker tails chat_messages by id, so questions asked on any worker
+    show up here; a snapshot file saves replaying the whole table on start.
+    """
+
+    def __init__(self, snapshot_path: str = SUGGEST_SNAPSHOT_PATH):
+        self.snapshot_path = snapshot_path
+        self.indexes = {}
+        self.last_message_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, scripture: str, text: str, user_ids, count: int = 1):
+        text = " ".join(text.split())
+        if not text or len(text) > SUGGEST_MAX_CHARS:
+            return
+        key = normalize_query(text)
+        if len(key) < 3:
+            return
+        # Never offer something the safety filter would block to other users.
+        if any(stage(text) for stage in safety_filter.stages):
+            return
+        with self._lock:
+            self.indexes.setdefault(scripture, PrefixIndex()).add(key, user_ids, count)
+
+    def suggest(self, scripture: str, prefix: str, limit: int = 5):
+        index = self.indexes.get(resolve_namespace(scripture))
+        if index is None:
+            return []
+        with self._lock:
+            return index.top(normalize_query(prefix), min(limit, SUGGEST_MAX_LIMIT), SUGGEST_MIN_USERS)
+
+    def refresh(self, batch_size: int = SUGGEST_BATCH_SIZE) -> int:
+        total = 0
+        while True:
+            with SessionLocal() as db:
+                rows = (
+                    db.query(ChatMessage.id, ChatMessage.content, ChatSession.scripture_id, ChatSession.user_id)
+                    .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+                    .filter(ChatMessage.id > self.last_message_id, ChatMessage.role == "user")
+                    .order_by(ChatMessage.id)
+                    .limit(batch_size)
+                    .all()
+                )
+            if not rows:
+                break
+            for _, content, scripture_id, user_id in rows:
+                self.add(resolve_namespace(scripture_id), content, [user_id])
+            self.last_message_id = rows[-1].id
+            total += len(rows)
+        if total:
+            with self._lock:
+                for scripture, index in self.indexes.items():
+                    index.prune(SUGGEST_MAX_QUESTIONS)
+                    INDEXED.labels(scripture).set(len(index.keys))
+        return total
+
+    def save(self):
+        with self._lock:
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "last_message_id": self.last_message_id,
+                "scriptures": {
+                    scripture: [[k, index.counts[k], sorted(index.users[k])] for k in index.keys]
+                    for scripture, index in self.indexes.items()
+                },
+            }
+        # Every worker saves to the same path, so each writes its own temp file.
+        directory, name = os.path.split(os.path.abspath(self.snapshot_path))
+        tmp = tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, prefix=name + ".", suffix=".tmp", delete=False
+        )
+        try:
+            with tmp:
+                json.dump(snapshot, tmp)
+            os.replace(tmp.name, self.snapshot_path)
+        except BaseException:
+            os.remove(tmp.name)
+            raise
+
+    def load(self):
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            print(f"[WARNING] Ignoring unreadable suggestion snapshot: {e}")
+            return
+        with SessionLocal() as db:
+            max_id = db.query(func.max(ChatMessage.id)).scalar() or 0
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot["last_message_id"] > max_id:
+            # Older snapshot format, or a snapshot from a different or reset database.
+            return
+        for scripture, questions in snapshot["scriptures"].items():
+            for key, count, user_ids in questions:
+                self.add(scripture, key, user_ids, count)
+        self.last_message_id = snapshot["last_message_id"]
+
+
+suggestions = SuggestionIndex()
+
+
+async def run_forever():
+    try:
+        await asyncio.to_thread(suggestions.load)
+    except Exception as e:
+        print(f"[suggest] snapshot load failed: {e}")
+    last_snapshot = time.monotonic()
+    while True:
+        try:
+            await asyncio.to_thread(suggestions.refresh)
+            if time.monotonic() - last_snapshot >= SUGGEST_SNAPSHOT_S:
+                await asyncio.to_thread(suggestions.save)
+                last_snapshot = time.monotonic()
+        except Exception as e:
+            print(f"[suggest] refresh failed: {e}")
+        await asyncio.sleep(SUGGEST_REFRESH_S)
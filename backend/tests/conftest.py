@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# database.py builds its engines at import time, so point it at a throwaway
+# SQLite file before any backend module is imported.
+_db_dir = tempfile.mkdtemp(prefix="secularai-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_batcher import BatchedEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_flushes_when_batch_is_full():
+    inner = RecordingEmbeddings()
+    batcher = BatchedEmbeddings(inner, window_ms=2000, max_batch=4)
+    texts = ["a", "bb", "ccc", "dddd"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        vectors = list(pool.map(batcher.embed_query, texts))
+
+    assert time.perf_counter() - start < 1
+    assert vectors == [[1.0], [2.0], [3.0], [4.0]]
+    assert [sorted(batch) for batch in inner.batches] == [texts]
+
+
+def test_flushes_when_window_expires():
+    inner = RecordingEmbeddings()
+    batcher = BatchedEmbeddings(inner, window_ms=50, max_batch=32)
+
+    start = time.perf_counter()
+    assert batcher.embed_query("lonely") == [6.0]
+
+    assert time.perf_counter() - start >= 0.05
+    assert inner.batches == [["lonely"]]
+
+
+def test_duplicate_texts_are_embedded_once():
+    inner = RecordingEmbeddings()
+    batcher = BatchedEmbeddings(inner, window_ms=2000, max_batch=3)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        vectors = list(pool.map(batcher.embed_query, ["same", "same", "other"]))
+
+    assert vectors == [[4.0], [4.0], [5.0]]
+    assert [sorted(batch) for batch in inner.batches] == [["other", "same"]]
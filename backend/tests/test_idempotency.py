@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+import database
+import models
+from idempotency import IdempotentRequests
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def schema():
+    models.Base.metadata.create_all(bind=database.engine)
+    yield
+    # Pooled aiosqlite connections belong to this test's event loop.
+    await database.async_engine.dispose()
+
+
+def counting_handler(response, delay=0.0):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return response
+
+    return handler, calls
+
+
+@pytest.mark.asyncio
+async def test_retry_replays_stored_response():
+    requests = IdempotentRequests()
+    handler, calls = counting_handler({"answer": "first"})
+
+    first = await requests.run("s-replay", "k1", "hash-a", handler)
+    second = await requests.run("s-replay", "k1", "hash-a", handler)
+
+    assert first == second == {"answer": "first"}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_retry_waits_for_original():
+    requests = IdempotentRequests()
+    handler, calls = counting_handler({"answer": "slow"}, delay=0.1)
+
+    results = await asyncio.gather(
+        requests.run("s-concurrent", "k1", "hash-a", handler),
+        requests.run("s-concurrent", "k1", "hash-a", handler),
+    )
+
+    assert results == [{"answer": "slow"}, {"answer": "slow"}]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_reused_key_with_different_body_is_rejected():
+    requests = IdempotentRequests()
+    handler, calls = counting_handler({"answer": "first"})
+    await requests.run("s-mismatch", "k1", "hash-a", handler)
+
+    with pytest.raises(HTTPException) as exc:
+        await requests.run("s-mismatch", "k1", "hash-b", handler)
+    assert exc.value.status_code == 422
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_request_releases_key():
+    requests = IdempotentRequests()
+
+    async def failing():
+        raise RuntimeError("llm down")
+
+    with pytest.raises(RuntimeError):
+        await requests.run("s-release", "k1", "hash-a", failing)
+
+    handler, calls = counting_handler({"answer": "retried"})
+    assert await requests.run("s-release", "k1", "hash-a", handler) == {"answer": "retried"}
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_same_key_in_other_session_is_independent():
+    requests = IdempotentRequests()
+    handler, calls = counting_handler({"answer": "ok"})
+
+    await requests.run("s-one", "shared", "hash-a", handler)
+    await requests.run("s-two", "shared", "hash-b", handler)
+    assert len(calls) == 2
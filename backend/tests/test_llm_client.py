@@ -0,0 +1,132 @@
+import threading
+import time
+
+import groq
+import httpx
+import pytest
+
+import llm_client
+from llm_client import CircuitBreaker, LLMClient, LLMUnavailable
+
+
+def connection_error():
+    return groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.test"))
+
+
+class FakeGroq:
+    """Stands in for Groq: per-model delay and optional error, records calls."""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+
+    def with_options(self, **_):
+        return self
+
+    def create(self, model, **_):
+        with self._lock:
+            self.calls.append(model)
+        delay, error = self.behaviour[model]
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        return f"reply from {model}"
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker("test-open", failure_threshold=2, reset_timeout_s=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test-probe", failure_threshold=1, reset_timeout_s=60)
+    breaker.record_failure()
+    breaker.opened_at -= 61
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_probe_success_closes():
+    breaker = CircuitBreaker("test-close", failure_threshold=1, reset_timeout_s=60)
+    breaker.record_failure()
+    breaker.opened_at -= 61
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_probe_failure_reopens():
+    breaker = CircuitBreaker("test-reopen", failure_threshold=3, reset_timeout_s=60)
+    for _ in range(3):
+        breaker.record_failure()
+    breaker.opened_at -= 61
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_release_frees_probe():
+    breaker = CircuitBreaker("test-release", failure_threshold=1, reset_timeout_s=60)
+    breaker.record_failure()
+    breaker.opened_at -= 61
+    assert breaker.allow()
+
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_AFTER_S", 0.05)
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 0)
+
+
+def test_hedge_not_sent_when_primary_is_fast(hedging):
+    fake = FakeGroq({"fast-primary": (0, None), "fast-fallback": (0, None)})
+    reply = LLMClient(fake).complete("fast-primary", "fast-fallback")
+    assert reply == "reply from fast-primary"
+    assert fake.calls == ["fast-primary"]
+
+
+def test_hedge_fallback_wins_over_slow_primary(hedging):
+    fake = FakeGroq({"slow-primary": (0.5, None), "quick-fallback": (0, None)})
+    start = time.monotonic()
+    reply = LLMClient(fake).complete("slow-primary", "quick-fallback")
+    assert reply == "reply from quick-fallback"
+    assert time.monotonic() - start < 0.4
+
+
+def test_hedge_primary_wins_when_it_finishes_first(hedging):
+    fake = FakeGroq({"steady-primary": (0.1, None), "slower-fallback": (0.5, None)})
+    reply = LLMClient(fake).complete("steady-primary", "slower-fallback")
+    assert reply == "reply from steady-primary"
+    assert fake.calls == ["steady-primary", "slower-fallback"]
+
+
+def test_hedge_sent_immediately_when_primary_fails(hedging):
+    fake = FakeGroq({"broken-primary": (0, connection_error()), "backup-fallback": (0, None)})
+    reply = LLMClient(fake).complete("broken-primary", "backup-fallback")
+    assert reply == "reply from backup-fallback"
+
+
+def test_hedge_gives_up_at_deadline(hedging):
+    fake = FakeGroq({"stuck-primary": (1, None), "stuck-fallback": (1, None)})
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailable):
+        LLMClient(fake).complete("stuck-primary", "stuck-fallback", deadline_s=0.2)
+    assert time.monotonic() - start < 0.5
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_followers_share_leader_result():
+    flights = SingleFlight("test-share")
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    results = await asyncio.gather(*(flights.do("q", fn) for _ in range(3)))
+    assert calls == 1
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert all(result == "answer" for result, _ in results)
+
+
+@pytest.mark.asyncio
+async def test_follower_receives_leader_exception():
+    flights = SingleFlight("test-error")
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream failed")
+
+    leader = asyncio.create_task(flights.do("q", fn))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("q", fn))
+
+    for task in (leader, follower):
+        with pytest.raises(ValueError, match="upstream failed"):
+            await task
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_key_is_released_after_call():
+    flights = SingleFlight("test-release")
+
+    async def fn():
+        return "answer"
+
+    assert await flights.do("q", fn) == ("answer", False)
+    assert await flights.do("q", fn) == ("answer", False)
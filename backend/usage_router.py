@@ -0,0 +1,171 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from datetime import datetime, timedelta
+import os
+
+from database import get_db
+from models import User, ChatSession, ChatMessage, InsightUsage
+from chat_router import get_current_user
+
+router = APIRouter(prefix="/api/usage", tags=["Usage"])
+
+USAGE_ADMINS = {
+    u.strip() for u in os.getenv("USAGE_ADMINS", "").split(",") if u.strip()
+}
+
+
+def require_usage_admin(current_user: User = Depends(get_current_user)):
+    if current_user.username not in USAGE_ADMINS:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return current_user
+
+
+def _totals(query):
+    return query.with_entities(
+        func.count(ChatMessage.id),
+        func.coalesce(func.sum(ChatMessage.prompt_tokens), 0),
+        func.coalesce(func.sum(ChatMessage.completion_tokens), 0),
+        func.avg(ChatMessage.retrieval_ms),
+        func.avg(ChatMessage.llm_ms),
+    )
+
+
+def message_rollup(db: Session, group_col, days: int, user_id: int = None):
+    since = datetime.utcnow() - timedelta(days=days)
+    query = (
+        db.query(ChatMessage)
+        .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+        .filter(
+            ChatMessage.role == "ai",
+            ChatMessage.source.is_(None),
+            ChatMessage.created_at >= since,
+        )
+    )
+    if user_id is not None:
+        query = query.filter(ChatSession.user_id == user_id)
+
+    rows = (
+        _totals(query)
+        .add_columns(group_col.label("key"))
+        .group_by(group_col)
+        .order_by(group_col)
+        .all()
+    )
+    return [
+        {
+            "key": str(key),
+            "replies": replies,
+            "prompt_tokens": int(prompt_tokens),
+            "completion_tokens": int(completion_tokens),
+            "avg_retrieval_ms": round(avg_retrieval, 1) if avg_retrieval is not None else None,
+            "avg_llm_ms": round(avg_llm, 1) if avg_llm is not None else None,
+        }
+        for replies, prompt_tokens, completion_tokens, avg_retrieval, avg_llm, key in rows
+    ]
+
+
+def _insight_totals(calls, p, c, avg_llm):
+    return {
+        "calls": calls,
+        "prompt_tokens": int(p),
+        "completion_tokens": int(c),
+        "avg_llm_ms": round(avg_llm, 1) if avg_llm is not None else None,
+    }
+
+
+def _insight_query(db: Session, days: int, user_id: int = None, *columns):
+    since = datetime.utcnow() - timedelta(days=days)
+    query = db.query(
+        *columns,
+        func.count(InsightUsage.id),
+        func.coalesce(func.sum(InsightUsage.prompt_tokens), 0),
+        func.coalesce(func.sum(InsightUsage.completion_tokens), 0),
+        func.avg(InsightUsage.llm_ms),
+    ).filter(InsightUsage.created_at >= since)
+    if user_id is not None:
+        query = query.filter(InsightUsage.user_id == user_id)
+    return query
+
+
+def insight_rollup(db: Session, group_col, days: int, user_id: int = None):
+    rows = _insight_query(db, days, user_id, group_col).group_by(group_col).all()
+    return {str(key): _insight_totals(*totals) for key, *totals in rows}
+
+
+def insight_total(db: Session, days: int, user_id: int = None):
+    # Insights are not tied to a scripture, so they are reported next to that rollup.
+    return _insight_totals(*_insight_query(db, days, user_id).one())
+
+
+def with_insights(rows, insights):
+    seen = set()
+    for row in rows:
+        row["insights"] = insights.get(row["key"])
+        seen.add(row["key"])
+    for key, totals in insights.items():
+        if key not in seen:
+            rows.append({
+                "key": key,
+                "replies": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "avg_retrieval_ms": None,
+                "avg_llm_ms": None,
+                "insights": totals,
+            })
+    return sorted(rows, key=lambda row: row["key"])
+
+
+@router.get("/me")
+def get_my_usage(
+    days: int = 30,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return {
+        "by_day": with_insights(
+            message_rollup(db, func.date(ChatMessage.created_at), days, user_id=current_user.id),
+            insight_rollup(db, func.date(InsightUsage.created_at), days, user_id=current_user.id),
+        ),
+        "by_scripture": message_rollup(
+            db, ChatSession.scripture_id, days, user_id=current_user.id
+        ),
+        "insights": insight_total(db, days, user_id=current_user.id),
+    }
+
+
+@router.get("/users")
+def get_usage_by_user(
+    days: int = 30,
+    _: User = Depends(require_usage_admin),
+    db: Session = Depends(get_db),
+):
+    return with_insights(
+        message_rollup(db, ChatSession.user_id, days),
+        insight_rollup(db, InsightUsage.user_id, days),
+    )
+
+
+@router.get("/scriptures")
+def get_usage_by_scripture(
+    days: int = 30,
+    _: User = Depends(require_usage_admin),
+    db: Session = Depends(get_db),
+):
+    return {
+        "by_scripture": message_rollup(db, ChatSession.scripture_id, days),
+        "insights": insight_total(db, days),
+    }
+
+
+@router.get("/daily")
+def get_usage_by_day(
+    days: int = 30,
+    _: User = Depends(require_usage_admin),
+    db: Session = Depends(get_db),
+):
+    return with_insights(
+        message_rollup(db, func.date(ChatMessage.created_at), days),
+        insight_rollup(db, func.date(InsightUsage.created_at), days),
+    )
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc
+from typing import Optional
+
+from database import get_db
+from models import User, VerseCitation
+from chat_router import get_current_user
+from scriptures import resolve_namespace
+
+router = APIRouter(prefix="/api/verses", tags=["Verse Citations"])
+
+
+def top_cited(db: Session, filters, limit: int):
+    count = func.count(VerseCitation.id).label("count")
+    rows = (
+        db.query(
+            VerseCitation.scripture_id,
+            VerseCitation.reference_key,
+            func.max(VerseCitation.reference),
+            func.max(VerseCitation.text),
+            count,
+        )
+        .filter(*filters)
+        .group_by(VerseCitation.scripture_id, VerseCitation.reference_key)
+        .order_by(desc(count))
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"scripture_id": scripture_id, "reference": reference, "text": text, "count": n}
+        for scripture_id, _, reference, text, n in rows
+    ]
+
+
+@router.get("/top/{scripture_id}")
+def get_top_verses(scripture_id: str, limit: int = 10, db: Session = Depends(get_db)):
+    # Accepts either the frontend id ("bhagavad-gita") or the namespace ("gita").
+    return top_cited(db, [VerseCitation.scripture_id == resolve_namespace(scripture_id)], min(limit, 100))
+
+
+@router.get("/me")
+def get_my_top_verses(
+    scripture_id: Optional[str] = None,
+    limit: int = 10,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    filters = [VerseCitation.user_id == current_user.id]
+    if scripture_id:
+        filters.append(VerseCitation.scripture_id == resolve_namespace(scripture_id))
+    return top_cited(db, filters, min(limit, 100))
@@ -29,6 +29,17 @@ import {
 
 const BACKEND_URL = import.meta.env.VITE_BACKEND_URL || "http://localhost:8000";
 
+// crypto.randomUUID only exists in secure contexts, so fall back to
+// getRandomValues and skip the header when neither is available.
+const newIdempotencyKey = (): string | undefined => {
+  const c = globalThis.crypto;
+  if (c?.randomUUID) return c.randomUUID();
+  if (c?.getRandomValues) {
+    return Array.from(c.getRandomValues(new Uint8Array(16)), (b) => b.toString(16).padStart(2, "0")).join("");
+  }
+  return undefined;
+};
+
 const sentimentColors: Record<string, string> = {
   Contemplative: "262 60% 55%",
   Peaceful: "152 50% 45%",
@@ -288,11 +299,15 @@ const ChatPage = () => {
 
     abortControllerRef.current = new AbortController();
 
-    try {
-      const res = await fetch(`${BACKEND_URL}/query`, {
+    // One key per question, reused on the retry, so a request that reached
+    // the server is replayed instead of answered twice.
+    const idempotencyKey = newIdempotencyKey();
+    const sendQuery = () =>
+      fetch(`${BACKEND_URL}/query`, {
         method: "POST",
         headers: {
-          "Content-Type": "application/json"
+          "Content-Type": "application/json",
+          ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
         },
         body: JSON.stringify({
           user_query: userText,
@@ -300,9 +315,21 @@ const ChatPage = () => {
           scripture: scripture.name,
           session_id: activeSessionId
         }),
-        signal: abortControllerRef.current.signal,
+        signal: abortControllerRef.current?.signal,
       });
 
+    try {
+      let res: Response;
+      try {
+        res = await sendQuery();
+      } catch (error: any) {
+        if (error.name === "AbortError" || !idempotencyKey) throw error;
+        res = await sendQuery();
+      }
+      if (idempotencyKey && (res.status === 409 || res.status >= 500)) {
+        res = await sendQuery();
+      }
+
       if (!res.ok) throw new Error(`HTTP error ${res.status}`);
 
       const data = await res.json();